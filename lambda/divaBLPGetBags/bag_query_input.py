@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import util_constants
+from util_helper import decode_cursor
+
+
+@dataclass
+class BagQueryInput:
+    # The pattern is registered by models.bag, import it before parsing
+    color: str = field(metadata={"registry": "color"})
+    weight_min: Optional[float] = field(
+        metadata={"regex": util_constants.WEIGHT_REGEX, "converter": float}
+    )
+    weight_max: Optional[float] = field(
+        metadata={"regex": util_constants.WEIGHT_REGEX, "converter": float}
+    )
+    limit: Optional[int] = field(
+        metadata={"regex": util_constants.PAGE_LIMIT_REGEX, "converter": int}
+    )
+    cursor: Optional[dict] = field(
+        metadata={"regex": util_constants.CURSOR_REGEX, "converter": decode_cursor}
+    )
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import os
+
+# We need to import the directory into the path for pytest to find the other files in the directory
+import sys
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from api_response_handler import BadRequest, api_response_handler
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.logging.correlation_paths import API_GATEWAY_REST
+
+from models.bag import Bag
+from bag_query_input import BagQueryInput
+import stage_metrics
+from logger import log_event
+from request_validation import parse_event
+from util_constants import QUERY_PATH_GSI
+from util_helper import encode_cursor
+
+# Initialize env vars
+CORS = os.environ["CORS"].strip()
+# Page size of a request without a limit, a colour partition is never read whole
+DEFAULT_PAGE_LIMIT = int(os.environ.get("DEFAULT_PAGE_LIMIT", 100))
+
+log = Logger()
+tracer = Tracer()
+
+
+@tracer.capture_lambda_handler
+@stage_metrics.timed_handler("divaBLPGetBags")
+@api_response_handler
+@log.inject_lambda_context(correlation_id_path=API_GATEWAY_REST, log_event=False)
+def lambda_handler(event, context):
+    log_event(event, log)
+    bag_query_input = parse_event(event, BagQueryInput)
+    stage_metrics.set_query_path(QUERY_PATH_GSI)
+    with stage_metrics.stage("query"):
+        bags = find_bags(bag_query_input)
+        items = [bag.attribute_values for bag in bags]
+    stage_metrics.count("query", len(items))
+
+    return {"items": items, "next_cursor": encode_cursor(bags.last_evaluated_key)}
+
+
+def find_bags(bag_query_input: BagQueryInput):
+    return Bag.color_weight_index.query(
+        bag_query_input.color,
+        weight_condition(bag_query_input.weight_min, bag_query_input.weight_max),
+        limit=bag_query_input.limit or DEFAULT_PAGE_LIMIT,
+        last_evaluated_key=bag_query_input.cursor,
+    )
+
+
+def weight_condition(weight_min: Optional[float], weight_max: Optional[float]):
+    if weight_min is not None and weight_max is not None:
+        if weight_min > weight_max:
+            raise BadRequest(f"weight_min {weight_min} is above weight_max {weight_max}")
+        return Bag.weight.between(weight_min, weight_max)
+    elif weight_min is not None:
+        return Bag.weight >= weight_min
+    elif weight_max is not None:
+        return Bag.weight <= weight_max
+    return None
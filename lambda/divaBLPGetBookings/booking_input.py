@@ -1,10 +1,35 @@
 from dataclasses import dataclass, field
 from typing import Optional
 
+import regex_registry
 import util_constants
+from util_helper import decode_cursor
+
+
+def capsule_id_list(value) -> list:
+    """Converter of capsule_ids: a non-empty list of capsule ids, each in the capsule_id format"""
+    pattern = regex_registry.REGISTRY.get("capsule_id")
+    if not isinstance(value, list) or not value:
+        raise ValueError("capsule_ids has to be a non-empty list")
+    for capsule_id in value:
+        if not isinstance(capsule_id, str) or pattern.fullmatch(capsule_id) is None:
+            raise ValueError(f"{capsule_id} is not a valid capsule_id")
+    return value
+
+
 @dataclass
 class BookingInput:
     company: Optional[str]
     start_of_week: Optional[str] = field(metadata={"regex": util_constants.DATE_REGEX})
     location: Optional[str]
     capsule_id: Optional[str]
+    limit: Optional[int] = field(
+        metadata={"regex": util_constants.PAGE_LIMIT_REGEX, "converter": int}
+    )
+    cursor: Optional[dict] = field(
+        metadata={"regex": util_constants.CURSOR_REGEX, "converter": decode_cursor}
+    )
+    start_of_week_from: Optional[str] = field(metadata={"regex": util_constants.DATE_REGEX})
+    start_of_week_to: Optional[str] = field(metadata={"regex": util_constants.DATE_REGEX})
+    capsule_ids: Optional[list] = field(metadata={"converter": capsule_id_list})
+    activity_date: Optional[str] = field(metadata={"regex": util_constants.DATE_REGEX})
@@ -1,71 +1,461 @@
 # -*- coding: utf-8 -*-
-from dataclasses import dataclass
 import os
 import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 # We need to import the directory into the path for pytest to find the other files in the directory
 import sys
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
-from api_response_handler import api_response_handler
+from api_response_handler import BadRequest, api_response_handler
 from booking_input import BookingInput
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.logging.correlation_paths import API_GATEWAY_REST
 
+import stage_metrics
+from logger import log_event
 from request_validation import parse_event
-from util_helper import clean_data_fields, decrypt_data
-from models.booking import Booking
+from response import JsonArrayEncoder
+from util_constants import (
+    QUERY_PATH_BATCH_GET,
+    QUERY_PATH_CAPSULE,
+    QUERY_PATH_CAPSULES,
+    QUERY_PATH_GSI,
+    QUERY_PATH_GSI_LOCATION,
+    QUERY_PATH_SCAN,
+)
+from util_helper import (
+    LRUCache,
+    ReadThroughCache,
+    clean_data_fields,
+    decrypt_data_bulk,
+    encode_cursor,
+    parallel_scan,
+)
+from models.booking import Booking, company_location_key
 
 # Initialize env vars
 CORS = os.environ["CORS"].strip()
+SCAN_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", 1))
+MAX_RANGE_WEEKS = int(os.environ.get("MAX_RANGE_WEEKS", 13))
+# A BatchGetItem request holds at most 100 keys, pynamodb splits larger batches
+MAX_CAPSULE_IDS = int(os.environ.get("MAX_CAPSULE_IDS", 50))
+CAPSULE_QUERY_MAX_WORKERS = int(os.environ.get("CAPSULE_QUERY_MAX_WORKERS", 8))
+
+BOOKING_KEYS = ["company", "location", "capsule_id", "activity_date", "nric_sha"]
+FIELDS_TO_DECRYPT = ["nric_sha"]
+# Resuming a GSI query mid-page rebuilds the last evaluated key from the index keys
+INDEX_PROJECTION = BOOKING_KEYS + ["start_of_week"]
+LOCATION_INDEX_PROJECTION = INDEX_PROJECTION + ["company_location"]
+# Key attributes of a cursor pointing at a booking, per query path
+TABLE_KEYS = ["capsule_id", "activity_date"]
+CURSOR_KEYS = {
+    QUERY_PATH_CAPSULE: TABLE_KEYS,
+    QUERY_PATH_GSI: TABLE_KEYS + ["company", "start_of_week"],
+    QUERY_PATH_GSI_LOCATION: TABLE_KEYS + ["company_location", "start_of_week"],
+    QUERY_PATH_SCAN: TABLE_KEYS,
+}
+# Rows are pulled, decrypted and encoded STREAM_CHUNK_SIZE at a time
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 200))
+
+BOOKING_CACHE_TTL = float(os.environ.get("BOOKING_CACHE_TTL", 5))
+BOOKING_CACHE = ReadThroughCache(
+    LRUCache(
+        int(os.environ.get("BOOKING_CACHE_MAX_ITEMS", 256)),
+        BOOKING_CACHE_TTL,
+        max_bytes=int(os.environ.get("BOOKING_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+        # Results are cached encoded, the JSON length is their size
+        sizeof=lambda result: len(result[0]),
+    )
+)
 
 log = Logger()
 tracer = Tracer()
 
-@dataclass
-class BookingInput:
-    company: Optional[str]
-    start_of_week: Optional[str]
-    location: Optional[str]
-    capsule_id: Optional[str]
-
 
 @tracer.capture_lambda_handler
+@stage_metrics.timed_handler("divaBLPGetBookings")
 @api_response_handler
-@log.inject_lambda_context(correlation_id_path=API_GATEWAY_REST, log_event=True)
+@log.inject_lambda_context(correlation_id_path=API_GATEWAY_REST, log_event=False)
 def lambda_handler(event, context):
+    log_event(event, log)
     booking_input = parse_event(event, BookingInput)
+    validate_week_range(booking_input)
+    validate_capsule_ids(booking_input)
+    validate_cursor(booking_input)
+    stage_metrics.set_query_path(query_path(booking_input))
+    items, last_evaluated_key, truncated = get_bookings(booking_input)
+
+    # A result cut short by the response budget is paged, whatever the request asked for
+    if booking_input.limit is None and booking_input.cursor is None and not truncated:
+        return items
+    if booking_input.capsule_ids:
+        # The capsule ids left out are the continuation of a batch
+        return '{"items": %s, "truncated": true, "unprocessed_capsule_ids": %s}' % (
+            items,
+            json.dumps(last_evaluated_key),
+        )
+    body = '{"items": %s, "next_cursor": %s' % (
+        items,
+        json.dumps(encode_cursor(last_evaluated_key)),
+    )
+    return body + (', "truncated": true}' if truncated else "}")
+
+
+def get_bookings(booking_input: BookingInput) -> tuple[str, Optional[dict], bool]:
+    """Encoded bookings of the input, read through BOOKING_CACHE unless BOOKING_CACHE_TTL is 0
+    Returns:
+        items: STR, JSON array of the bookings
+        last_evaluated_key: DICT, where the next page starts, None after the last page.
+            LIST of the capsule ids left out for capsule_ids
+        truncated: BOOL, whether the response budget cut the result short
+    """
+    if BOOKING_CACHE_TTL <= 0:
+        return load_bookings(booking_input)
+
+    loaded = []
+
+    def loader():
+        loaded.append(True)
+        return load_bookings(booking_input)
+
+    result = BOOKING_CACHE.get(cache_key(booking_input), loader)
+    stage_metrics.count("cache_miss" if loaded else "cache_hit", 1)
+    return result
+
+
+def load_bookings(booking_input: BookingInput) -> tuple[str, Optional[dict], bool]:
+    if booking_input.capsule_ids:
+        return encode_capsule_bookings(load_capsule_bookings(booking_input))
+
     bookings = find_relevant_bookings(booking_input)
+    items, last_evaluated_key, truncated = encode_bookings(
+        bookings, CURSOR_KEYS[query_path(booking_input)]
+    )
+    if is_parallel_scan(booking_input):
+        # Stops the segments still scanning
+        bookings.close()
+        if truncated:
+            # Segments are interleaved, no cursor can resume them
+            log.warning("Parallel scan exceeds the response budget, page it with limit and cursor")
+            return items, None, True
+    return items, last_evaluated_key, truncated
+
 
-    return map_to_output(bookings)
+def encode_capsule_bookings(output: list[dict]) -> tuple[str, Optional[list], bool]:
+    """Encode the entries of load_capsule_bookings within the response budget
+    Returns:
+        items: STR, JSON array of the entries
+        unprocessed_capsule_ids: LIST, capsule ids of the entries left out, None if all fit
+        truncated: BOOL, whether the response budget cut the result short
+    """
+    encoder = JsonArrayEncoder()
+    with stage_metrics.stage("encode"):
+        for idx, entry in enumerate(output):
+            if not encoder.add(entry):
+                if encoder.count == 0:
+                    raise ValueError("A capsule exceeds the response budget")
+                return encoder.getvalue(), [e["capsule_id"] for e in output[idx:]], True
+    return encoder.getvalue(), None, False
 
 
-def find_relevant_bookings(booking_input: BookingInput) -> list[Booking]:
+def encode_bookings(
+    bookings: Iterable[Booking], cursor_keys: list[str]
+) -> tuple[str, Optional[dict], bool]:
+    """Stream bookings through decrypt and mapping into a JsonArrayEncoder, one chunk at a
+    time, so at most a chunk of rows is held besides the encoded body. Stops at the
+    response budget with the key of the last encoded booking as last_evaluated_key.
+    Args:
+        bookings: ITERABLE, lazily paged bookings, e.g. a pynamodb ResultIterator
+        cursor_keys: LIST, key attributes of the cursor of the query path
+    Returns:
+        items: STR, JSON array of the bookings
+        last_evaluated_key: DICT, where the next page starts, None after the last page
+        truncated: BOOL, whether the response budget cut the result short
+    """
+    encoder = JsonArrayEncoder()
+    last_key = None
+    for chunk in iter_chunks(bookings):
+        # The key is taken before map_to_output drops the index attributes
+        keys = [booking_key(booking, cursor_keys) for booking in chunk]
+        output = map_to_output(chunk)
+        with stage_metrics.stage("encode"):
+            for booking, key in zip(output, keys):
+                if not encoder.add(booking):
+                    if encoder.count == 0:
+                        raise ValueError("A booking exceeds the response budget")
+                    return encoder.getvalue(), last_key, True
+                last_key = key
+
+    return encoder.getvalue(), getattr(bookings, "last_evaluated_key", None), False
+
+
+def iter_chunks(bookings: Iterable[Booking]) -> Iterator[list[Booking]]:
+    bookings = iter(bookings)
+    while True:
+        # Query and scan pages are fetched while the chunk is pulled
+        with stage_metrics.stage("query"):
+            chunk = list(islice(bookings, STREAM_CHUNK_SIZE))
+        if not chunk:
+            return
+        stage_metrics.count("query", len(chunk))
+        yield chunk
+
+
+def booking_key(booking: Booking, cursor_keys: list[str]) -> dict:
+    return {name: {"S": booking.attribute_values[name]} for name in cursor_keys}
+
+
+def query_path(booking_input: BookingInput) -> str:
+    if booking_input.capsule_ids and booking_input.activity_date:
+        return QUERY_PATH_BATCH_GET
+    elif booking_input.capsule_ids:
+        return QUERY_PATH_CAPSULES
+    elif booking_input.capsule_id:
+        return QUERY_PATH_CAPSULE
+    elif booking_input.company and booking_input.location:
+        return QUERY_PATH_GSI_LOCATION
+    elif booking_input.company:
+        return QUERY_PATH_GSI
+    return QUERY_PATH_SCAN
+
+
+def cache_key(booking_input: BookingInput) -> tuple:
+    """Normalised BookingInput: only the fields the query path reads, then the page"""
+    path = query_path(booking_input)
+    if path == QUERY_PATH_CAPSULE:
+        key = (path, booking_input.capsule_id)
+    elif path in (QUERY_PATH_CAPSULES, QUERY_PATH_BATCH_GET):
+        key = (path, tuple(booking_input.capsule_ids), booking_input.activity_date)
+    elif path in (QUERY_PATH_GSI, QUERY_PATH_GSI_LOCATION):
+        key = (
+            path,
+            booking_input.company,
+            booking_input.start_of_week,
+            booking_input.location,
+            booking_input.start_of_week_from,
+            booking_input.start_of_week_to,
+        )
+    else:
+        key = (path,)
+    return key + (booking_input.limit, encode_cursor(booking_input.cursor))
+
+
+def invalidate_bookings(
+    capsule_id: Optional[str] = None,
+    company: Optional[str] = None,
+    start_of_week: Optional[str] = None,
+    location: Optional[str] = None,
+) -> int:
+    """Invalidation hook for write paths: drops every cached result a booking with these
+    attributes can be part of, scans included. Attributes left out match anything.
+    Returns:
+        removed: INT, number of cached results dropped
+    """
+    def affected(key: tuple) -> bool:
+        if key[0] == QUERY_PATH_CAPSULE:
+            return capsule_id is None or key[1] == capsule_id
+        if key[0] in (QUERY_PATH_CAPSULES, QUERY_PATH_BATCH_GET):
+            return capsule_id is None or capsule_id in key[1]
+        if key[0] in (QUERY_PATH_GSI, QUERY_PATH_GSI_LOCATION):
+            _, key_company, key_week, key_location, week_from, week_to = key[:6]
+            if week_from is not None and start_of_week is not None:
+                in_weeks = week_from <= start_of_week <= week_to
+            else:
+                in_weeks = start_of_week is None or key_week in (None, start_of_week)
+            # A key without a location holds every site of the company
+            return (
+                in_weeks
+                and company in (None, key_company)
+                and (location is None or key_location in (None, location))
+            )
+        return True
+
+    return BOOKING_CACHE.invalidate_where(affected)
+
+
+def validate_week_range(booking_input: BookingInput):
+    """Plan check of start_of_week_from/start_of_week_to: a company query with both
+    bounds, in order, spanning at most MAX_RANGE_WEEKS weeks
+    """
+    week_from, week_to = booking_input.start_of_week_from, booking_input.start_of_week_to
+    if week_from is None and week_to is None:
+        return
+    if booking_input.capsule_id or not booking_input.company:
+        raise BadRequest("start_of_week_from and start_of_week_to need a company query")
+    if booking_input.start_of_week is not None:
+        raise BadRequest("start_of_week cannot be combined with start_of_week_from and start_of_week_to")
+    if week_from is None or week_to is None:
+        raise BadRequest("Unbounded range: both start_of_week_from and start_of_week_to are required")
+    try:
+        weeks = (
+            datetime.date.fromisoformat(week_to) - datetime.date.fromisoformat(week_from)
+        ).days // 7 + 1
+    except ValueError as e:
+        raise BadRequest(f"Invalid start_of_week range: {e}")
+    if weeks < 1:
+        raise BadRequest(f"start_of_week_from {week_from} is after start_of_week_to {week_to}")
+    if weeks > MAX_RANGE_WEEKS:
+        raise BadRequest(f"The range spans {weeks} weeks, at most {MAX_RANGE_WEEKS} are allowed")
+
+
+def validate_capsule_ids(booking_input: BookingInput):
+    """Plan check of capsule_ids: at most MAX_CAPSULE_IDS ids, not combined with the other
+    query paths, week filters or pagination. activity_date is only read with capsule_ids.
+    """
+    capsule_ids = booking_input.capsule_ids
+    if capsule_ids is None:
+        if booking_input.activity_date is not None:
+            raise BadRequest("activity_date needs capsule_ids")
+        return
+    if len(capsule_ids) > MAX_CAPSULE_IDS:
+        raise BadRequest(f"{len(capsule_ids)} capsule_ids requested, at most {MAX_CAPSULE_IDS} are allowed")
+    if booking_input.capsule_id or booking_input.company or booking_input.location:
+        raise BadRequest("capsule_ids cannot be combined with capsule_id, company or location")
+    if any(
+        week is not None
+        for week in (
+            booking_input.start_of_week,
+            booking_input.start_of_week_from,
+            booking_input.start_of_week_to,
+        )
+    ):
+        raise BadRequest("capsule_ids cannot be combined with start_of_week, use activity_date")
+    if booking_input.limit is not None or booking_input.cursor is not None:
+        raise BadRequest("capsule_ids cannot be paginated")
+
+
+def validate_cursor(booking_input: BookingInput):
+    """Plan check of cursor: its keys are the CURSOR_KEYS of the query path it is replayed on"""
+    if booking_input.cursor is None:
+        return
+    path = query_path(booking_input)
+    if set(booking_input.cursor) != set(CURSOR_KEYS[path]):
+        raise BadRequest(f"The cursor does not belong to a {path} query")
+
+
+def start_of_week_condition(booking_input: BookingInput):
+    """One range key condition for the week or, when given, the whole range of weeks"""
+    if booking_input.start_of_week_from is not None:
+        return Booking.start_of_week.between(
+            booking_input.start_of_week_from, booking_input.start_of_week_to
+        )
+    return Booking.start_of_week == booking_input.start_of_week
+
+
+def is_parallel_scan(booking_input: BookingInput) -> bool:
+    return (
+        query_path(booking_input) == QUERY_PATH_SCAN
+        and SCAN_SEGMENTS > 1
+        and booking_input.limit is None
+        and booking_input.cursor is None
+    )
+
+
+def find_relevant_bookings(booking_input: BookingInput) -> Iterable[Booking]:
+    """Bookings of the input, paged lazily as they are iterated. A query or sequential
+    scan exposes last_evaluated_key once iterated.
+    """
+    page_params = {
+        "limit": booking_input.limit,
+        "last_evaluated_key": booking_input.cursor,
+    }
     if booking_input.capsule_id:
-        bookings = Booking.query(booking_input.capsule_id)
+        bookings = Booking.query(
+            booking_input.capsule_id, attributes_to_get=BOOKING_KEYS, **page_params
+        )
+    elif booking_input.company and booking_input.location:
+        # Only the requested site's partition is read, instead of filtering every site
+        bookings = Booking.company_location_startofweek_index.query(
+            company_location_key(booking_input.company, booking_input.location),
+            start_of_week_condition(booking_input),
+            attributes_to_get=LOCATION_INDEX_PROJECTION,
+            **page_params,
+        )
     elif booking_input.company:
         bookings = Booking.company_startofweek_index.query(
             booking_input.company,
-            Booking.start_of_week == booking_input.start_of_week,
-            Booking.location == booking_input.location,
+            start_of_week_condition(booking_input),
+            attributes_to_get=INDEX_PROJECTION,
+            **page_params,
+        )
+    elif is_parallel_scan(booking_input):
+        bookings = parallel_scan(
+            Booking, SCAN_SEGMENTS, attributes_to_get=BOOKING_KEYS
         )
     else:
-        bookings = Booking.scan()
+        bookings = Booking.scan(attributes_to_get=BOOKING_KEYS, **page_params)
 
-    return list(bookings)
+    return bookings
+
+
+def load_capsule_bookings(booking_input: BookingInput) -> list[dict]:
+    """Bookings of every capsule_id in one call, in input order, e.g.
+        [{"capsule_id": "123456", "found": True, "items": [...]},
+         {"capsule_id": "654321", "found": False, "items": []}]
+    With an activity_date the keys are read with BatchGetItem, otherwise the capsule
+    partitions are queried concurrently on CAPSULE_QUERY_MAX_WORKERS threads.
+    """
+    # Duplicates are read once and repeated in the output
+    capsule_ids = list(dict.fromkeys(booking_input.capsule_ids))
+    with stage_metrics.stage("query"):
+        if booking_input.activity_date:
+            bookings = list(
+                Booking.batch_get(
+                    [(capsule_id, booking_input.activity_date) for capsule_id in capsule_ids],
+                    attributes_to_get=BOOKING_KEYS,
+                )
+            )
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(CAPSULE_QUERY_MAX_WORKERS, len(capsule_ids))
+            ) as executor:
+                bookings = [
+                    booking
+                    for partition in executor.map(query_capsule, capsule_ids)
+                    for booking in partition
+                ]
+    stage_metrics.count("query", len(bookings))
+
+    # Decrypted in one bulk call, then grouped back by capsule
+    by_capsule = {capsule_id: [] for capsule_id in capsule_ids}
+    for booking in sorted(map_to_output(bookings), key=lambda b: b["activity_date"]):
+        by_capsule[booking["capsule_id"]].append(booking)
+    return [
+        {
+            "capsule_id": capsule_id,
+            "found": bool(by_capsule[capsule_id]),
+            "items": by_capsule[capsule_id],
+        }
+        for capsule_id in booking_input.capsule_ids
+    ]
+
+
+def query_capsule(capsule_id: str) -> list[Booking]:
+    return list(Booking.query(capsule_id, attributes_to_get=BOOKING_KEYS))
 
 
 def map_to_output(bookings: list[Booking]) -> list[dict]:
-    booking_keys = ["company", "location", "capsule_id", "activity_date", "nric_sha"]
-    fields_to_decrypt = ["nric_sha"]
+    booking_keys = set(BOOKING_KEYS)
 
     output = []
-    for booking in bookings:
-        booking_dict = booking.attribute_values
-        clean_data_fields(booking_dict, booking_keys)
-        decrypt_data(booking_dict, fields_to_decrypt)
-        output.append(booking_dict)
+    with stage_metrics.stage("map_to_output"):
+        for booking in bookings:
+            booking_dict = booking.attribute_values
+            # Rows fetched with a matching projection need no cleanup
+            if not booking_keys.issuperset(booking_dict):
+                clean_data_fields(booking_dict, BOOKING_KEYS)
+            output.append(booking_dict)
+
+    with stage_metrics.stage("decrypt"):
+        failures = decrypt_data_bulk(output, FIELDS_TO_DECRYPT)
+    stage_metrics.count("decrypt", len(output))
+    if failures:
+        log.error(f"Unable to decrypt {len(failures)} bookings at rows {sorted(failures)}")
+        raise failures[min(failures)]
 
     return output
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+
+# We need to import the directory into the path for pytest to find the other files in the directory
+import sys
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from api_response_handler import BadRequest, api_response_handler
+from bag_input import BagInput
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.logging.correlation_paths import API_GATEWAY_REST
+
+import regex_registry
+import stage_metrics
+from logger import log_event
+from request_validation import parse_event
+from util_constants import QUERY_PATH_BATCH_WRITE
+from util_helper import batch_write_items
+from models.bag import Bag
+
+# Initialize env vars
+CORS = os.environ["CORS"].strip()
+BAG_DB_NAME = os.environ["BAG_DB_NAME"].strip()
+MAX_BAGS = int(os.environ.get("MAX_BAGS", 50000))
+
+BAG_KEYS = {"bag_id", "color", "weight"}
+STATUS_CREATED = "created"
+STATUS_INVALID = "invalid"
+STATUS_DUPLICATE = "duplicate"
+STATUS_FAILED = "failed"
+
+log = Logger()
+tracer = Tracer()
+
+
+@tracer.capture_lambda_handler
+@stage_metrics.timed_handler("divaBLPPutBags")
+@api_response_handler
+@log.inject_lambda_context(correlation_id_path=API_GATEWAY_REST, log_event=False)
+def lambda_handler(event, context):
+    log_event(event, log)
+    bag_input = parse_event(event, BagInput)
+    bags = bag_input.bags
+    if not isinstance(bags, list) or not 0 < len(bags) <= MAX_BAGS:
+        raise BadRequest(f"bags has to be a list of 1 to {MAX_BAGS} bags")
+
+    with stage_metrics.stage("parse"):
+        results, bags_to_write = validate_bags(bags)
+    stage_metrics.set_query_path(QUERY_PATH_BATCH_WRITE)
+    with stage_metrics.stage("write"):
+        failures = batch_write_items(
+            BAG_DB_NAME,
+            [Bag(**bag).serialize() for _, bag in bags_to_write],
+            [Bag._hash_keyname],
+        )
+    stage_metrics.count("write", len(bags_to_write))
+    for position, (idx, _) in enumerate(bags_to_write):
+        if position in failures:
+            results[idx].update(status=STATUS_FAILED, error=failures[position])
+        else:
+            results[idx]["status"] = STATUS_CREATED
+
+    log.info(
+        f"Wrote {len(bags_to_write) - len(failures)} of {len(results)} bags, {len(failures)} failed"
+    )
+    return results
+
+
+def validate_bags(bags: list) -> tuple[list[dict], list[tuple[int, dict]]]:
+    results = []
+    bags_to_write = []
+    seen_bag_ids = set()
+    for idx, bag in enumerate(bags):
+        bag_id = bag.get("bag_id") if isinstance(bag, dict) else None
+        results.append({"bag_id": bag_id})
+        if bag_id is None or bag.keys() != BAG_KEYS or not regex_registry.validate(bag):
+            results[idx]["status"] = STATUS_INVALID
+        elif bag_id in seen_bag_ids:
+            results[idx]["status"] = STATUS_DUPLICATE
+        else:
+            seen_bag_ids.add(bag_id)
+            bags_to_write.append((idx, {**bag, "weight": float(bag["weight"])}))
+
+    return results, bags_to_write
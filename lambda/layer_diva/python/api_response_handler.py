@@ -2,6 +2,7 @@ from dataclasses import dataclass
 import json
 from aws_lambda_powertools import Logger
 from response import ApiGwResponse
+import stage_metrics
 class NotFoundError(Exception):
     pass
 
@@ -19,7 +20,9 @@ log = Logger()
 def api_response_handler(func):
     def wrapper(event, context, **kwargs):
         try:
-            return ApiGwResponse(200, func(event, context, **kwargs)).to_json()
+            body = func(event, context, **kwargs)
+            with stage_metrics.stage("serialize"):
+                return ApiGwResponse(200, body).to_json()
         except BadRequest as e:
             log.warning(e)
             return ApiGwResponse(400, str(e)).to_json()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+# LOGGER
+log = logging.getLogger()
+
+# Shared by every client: a connection pool wide enough for the worker pools in
+# util_helper and kept-alive connections so warm invocations skip the TLS handshake
+CLIENT_CONFIG = {
+    "max_pool_connections": int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", 50)),
+    "tcp_keepalive": True,
+    "connect_timeout": int(os.environ.get("AWS_CONNECT_TIMEOUT", 5)),
+    "read_timeout": int(os.environ.get("AWS_READ_TIMEOUT", 30)),
+}
+
+
+SERVICE_CONFIGS = {
+    "cognito-idp": {"retries": {"max_attempts": 10, "mode": "standard"}},
+}
+
+
+class ModelMeta:
+    """Model Meta:
+    Base of the Meta of every pynamodb model. pynamodb creates its own DynamoDB client,
+    this gives it the pool size and timeouts of CLIENT_CONFIG. pynamodb has no
+    keep-alive option.
+    """
+    max_pool_connections = CLIENT_CONFIG["max_pool_connections"]
+    connect_timeout_seconds = CLIENT_CONFIG["connect_timeout"]
+    read_timeout_seconds = CLIENT_CONFIG["read_timeout"]
+
+
+_session = None
+_clients = {}
+_resources = {}
+_creation_times = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the boto3 session shared by every client of the layer, created on first use"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                # boto3 is imported on first use so handlers that never call AWS skip it
+                import boto3
+
+                _session = boto3.session.Session()
+    return _session
+
+
+def client(service_name):
+    """Returns the shared client of an AWS service, created on first use
+    Args:
+        service_name: STR, AWS service name, e.g. kms
+    Returns:
+        client: botocore client
+    """
+    existing = _clients.get(service_name)
+    if existing is not None:
+        return existing
+    return _create(_clients, "client", service_name)
+
+
+def resource(service_name):
+    """Returns the shared boto3 resource of an AWS service, created on first use.
+    Resources are not thread safe, use client() from worker threads.
+    Args:
+        service_name: STR, AWS service name, e.g. dynamodb
+    Returns:
+        resource: boto3 service resource
+    """
+    existing = _resources.get(service_name)
+    if existing is not None:
+        return existing
+    return _create(_resources, "resource", service_name)
+
+
+def creation_times():
+    """
+    Returns:
+        creation_times: DICT, milliseconds spent creating each client, e.g. {"client:kms": 12.3}
+    """
+    return dict(_creation_times)
+
+
+def reset():
+    """Drop every client, the next call creates them again"""
+    global _session
+    with _lock:
+        _session = None
+        _clients.clear()
+        _resources.clear()
+        _creation_times.clear()
+
+
+@lru_cache(maxsize=None)
+def _config(service_name):
+    from botocore.config import Config
+
+    return Config(**{**CLIENT_CONFIG, **SERVICE_CONFIGS.get(service_name, {})})
+
+
+def _create(registry, kind, service_name):
+    session = get_session()
+    with _lock:
+        if service_name not in registry:
+            start = time.perf_counter()
+            registry[service_name] = getattr(session, kind)(
+                service_name, config=_config(service_name)
+            )
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+            _creation_times[f"{kind}:{service_name}"] = elapsed_ms
+            log.debug("AWS: created %s %s in %s ms", kind, service_name, elapsed_ms)
+        return registry[service_name]
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 import logging
 import os
-import boto3
-from botocore.config import Config
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+try:
+    import aws_clients
+    import util_helper
+except ImportError:
+    from layer_diva.python import aws_clients, util_helper
 
 # LOGGER
 log = logging.getLogger()
@@ -19,14 +26,14 @@ except Exception as e:
     LOG_LEVEL = logging.INFO
 log.setLevel(LOG_LEVEL)
 
-config = Config(
-    retries={
-        'max_attempts': 10,
-        'mode': 'standard'
-    }
-)
-
-COGNITO = boto3.client('cognito-idp', config=config)
+COGNITO_MAX_WORKERS = int(os.environ.get('COGNITO_MAX_WORKERS', 4))
+# Default Cognito quotas: UserCreation 50 RPS, UserResourceUpdate 25 RPS
+COGNITO_CREATE_USER_RPS = float(os.environ.get('COGNITO_CREATE_USER_RPS', 50))
+COGNITO_ADD_TO_GROUP_RPS = float(os.environ.get('COGNITO_ADD_TO_GROUP_RPS', 25))
+PROVISION_PROGRESS_INTERVAL = 500
+PROVISION_STATUS_CREATED = 'created'
+PROVISION_STATUS_EXISTING = 'existing'
+PROVISION_STATUS_FAILED = 'failed'
 
 class Cognito:
     """Cognito Class:
@@ -41,51 +48,106 @@ class Cognito:
         Returns:
             users: LIST, all users in the Cognito user pool
         """
-        users = []
-        
-        query_params = {}
-        query_params['UserPoolId'] = self.pool_id
-        response = COGNITO.list_users(**query_params)
-        
-        users.extend(self._flatten(user) for user in response['Users'])
-
-        # Paginate
-        while 'PaginationToken' in response:
-            query_params['PaginationToken'] = response['PaginationToken']
-            response = COGNITO.list_users(**query_params)
-            users.extend(self._flatten(user) for user in response['Users'])
+        users = list(self.iter_users())
             
         log.info(f"COGNITO: Found {len(users)} users in user pool.")
                  
         return users
+    
+    def iter_users(self, page_size=None):
+        """
+        Stream all Cognito users in user pool, page by page
+        Args:
+            page_size: INT, users per list_users call, OPTIONAL
+        Yields:
+            user: DICT, flattened Cognito user
+        """
+        query_params = {}
+        query_params['UserPoolId'] = self.pool_id
+        if page_size:
+            query_params['Limit'] = page_size
+        while True:
+            response = aws_clients.client('cognito-idp').list_users(**query_params)
+            yield from (self._flatten(user) for user in response['Users'])
+
+            # Paginate
+            if 'PaginationToken' not in response:
+                return
+            query_params['PaginationToken'] = response['PaginationToken']
         
     def get_users_in_group(self, user_group):
         """
         List all Cognito users in a user group
         Args:
-            pool_id: STR, Cognito user pool id to query
+            user_group: STR, user group to list
         Returns:
             users: LIST, all users in the Cognito user pool in the specified user group
         """
-        users = []
+        users = list(self.iter_users_in_group(user_group))
         
+        log.info(f"COGNITO: Retrieved {len(users)} users in user group {user_group}.")
+                 
+        return users
+    
+    def iter_users_in_group(self, user_group, page_size=None):
+        """
+        Stream all Cognito users in a user group, page by page
+        Args:
+            user_group: STR, user group to list
+            page_size: INT, users per list_users_in_group call, OPTIONAL
+        Yields:
+            user: DICT, flattened Cognito user
+        """
         query_params = {}
         query_params['UserPoolId'] = self.pool_id
         query_params['GroupName'] = user_group
-        response = COGNITO.list_users_in_group(**query_params)
-        
-        users.extend(self._flatten(user) for user in response['Users'])
+        if page_size:
+            query_params['Limit'] = page_size
+        while True:
+            response = aws_clients.client('cognito-idp').list_users_in_group(**query_params)
+            yield from (self._flatten(user) for user in response['Users'])
 
-        # Paginate
-        while 'NextToken' in response:
+            # Paginate
+            if 'NextToken' not in response:
+                return
             query_params['NextToken'] = response['NextToken']
-            response = COGNITO.list_users(**query_params)
-            users.extend(self._flatten(user) for user in response['Users'])
-        
-        log.info(f"COGNITO: Retrieved {len(users)} users in user group {user_group}.")
-                 
+    
+    def get_users_in_groups(self, user_groups, max_workers=None):
+        """
+        List Cognito users of several user groups at once, each user once
+        Args:
+            user_groups: LIST, user groups to list
+            max_workers: INT, groups listed concurrently, defaults to COGNITO_MAX_WORKERS
+        Returns:
+            users: LIST, users in any of the user groups, deduplicated by Username
+        """
+        users = list(self.iter_users_in_groups(user_groups, max_workers))
+
+        log.info(f"COGNITO: Retrieved {len(users)} users in user groups {user_groups}.")
+
         return users
     
+    def iter_users_in_groups(self, user_groups, max_workers=None):
+        """
+        Stream Cognito users of several user groups, listing the groups on a worker pool.
+        Every worker shares the client, so throttling is retried with its retry config.
+        Args:
+            user_groups: LIST, user groups to list
+            max_workers: INT, groups listed concurrently, defaults to COGNITO_MAX_WORKERS
+        Yields:
+            user: DICT, flattened Cognito user, each Username once
+        """
+        producers = [
+            partial(self.iter_users_in_group, user_group) for user_group in user_groups
+        ]
+        seen_usernames = set()
+        for user in util_helper.iter_concurrently(
+            producers, max_workers=min(max_workers or COGNITO_MAX_WORKERS, len(producers) or 1)
+        ):
+            if user['Username'] not in seen_usernames:
+                seen_usernames.add(user['Username'])
+                yield user
+    
     def _flatten(self, user):
         flattened_user = {}
         for key, value in user.items():
@@ -105,6 +167,113 @@ class Cognito:
             attributes: DICT, dictionary containing custom attribute and value
             user_group: STR, user group to add user to (e.g. company_admin, supervisor, etc)
         """
+        aws_clients.client('cognito-idp').admin_create_user(
+            UserPoolId=self.pool_id,
+            Username=email,
+            UserAttributes=self._user_attributes(email, attributes)
+        )
+        
+        aws_clients.client('cognito-idp').admin_add_user_to_group(
+            UserPoolId=self.pool_id,
+            Username=email,
+            GroupName=user_group
+        )
+    
+    def provision_user(self, email, attributes, user_group, create_bucket=None, group_bucket=None):
+        """
+        Idempotent create_user: a user that already exists is only added to the user group
+        Args:
+            email: STR, email address of Cognito user to be created
+            attributes: DICT, dictionary containing custom attribute and value
+            user_group: STR, user group to add user to
+            create_bucket: TokenBucket, limits admin_create_user calls, OPTIONAL
+            group_bucket: TokenBucket, limits admin_add_user_to_group calls, OPTIONAL
+        Returns:
+            status: STR, PROVISION_STATUS_CREATED or PROVISION_STATUS_EXISTING
+        """
+        client = aws_clients.client('cognito-idp')
+        status = PROVISION_STATUS_CREATED
+        if create_bucket:
+            create_bucket.acquire()
+        try:
+            client.admin_create_user(
+                UserPoolId=self.pool_id,
+                Username=email,
+                UserAttributes=self._user_attributes(email, attributes)
+            )
+        except client.exceptions.UsernameExistsException:
+            status = PROVISION_STATUS_EXISTING
+
+        # Adding a member to a group it is already in is a no-op
+        if group_bucket:
+            group_bucket.acquire()
+        client.admin_add_user_to_group(
+            UserPoolId=self.pool_id,
+            Username=email,
+            GroupName=user_group
+        )
+        return status
+    
+    def create_users(self, users, max_workers=None, create_rate=None, group_rate=None, on_result=None):
+        """
+        Provision many users on a worker pool, rate limited to the Cognito quotas.
+        Failures are reported per user and do not stop the run.
+        Args:
+            users: LIST, DICT of email, attributes and user_group per user
+            max_workers: INT, users provisioned concurrently, defaults to COGNITO_MAX_WORKERS
+            create_rate: FLOAT, admin_create_user calls per second, defaults to COGNITO_CREATE_USER_RPS
+            group_rate: FLOAT, admin_add_user_to_group calls per second, defaults to COGNITO_ADD_TO_GROUP_RPS
+            on_result: FUNC, called with (user, status, error) as each user completes, OPTIONAL
+        Returns:
+            summary: DICT, {"created", "existing", "failed", "errors", "elapsed_s", "users_per_s"}
+        """
+        create_bucket = util_helper.TokenBucket(create_rate or COGNITO_CREATE_USER_RPS)
+        group_bucket = util_helper.TokenBucket(group_rate or COGNITO_ADD_TO_GROUP_RPS)
+        summary = {
+            PROVISION_STATUS_CREATED: 0,
+            PROVISION_STATUS_EXISTING: 0,
+            PROVISION_STATUS_FAILED: 0,
+            'errors': {},
+        }
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers or COGNITO_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    self.provision_user,
+                    user['email'],
+                    user.get('attributes', {}),
+                    user['user_group'],
+                    create_bucket,
+                    group_bucket,
+                ): user
+                for user in users
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                user = futures[future]
+                error = None
+                try:
+                    status = future.result()
+                except Exception as e:
+                    status = PROVISION_STATUS_FAILED
+                    error = str(e)
+                    summary['errors'][user['email']] = error
+                    log.error(f"COGNITO: Unable to provision {user['email']}: {e}")
+                summary[status] += 1
+                if on_result:
+                    on_result(user, status, error)
+                if completed % PROVISION_PROGRESS_INTERVAL == 0:
+                    log.info(f"COGNITO: Provisioned {completed}/{len(futures)} users, "
+                             f"{completed / (time.monotonic() - start):.1f} users/s.")
+
+        summary['elapsed_s'] = round(time.monotonic() - start, 3)
+        total = len(futures)
+        summary['users_per_s'] = round(total / summary['elapsed_s'], 3) if summary['elapsed_s'] else total
+        log.info(f"COGNITO: Provisioned {total} users: {summary[PROVISION_STATUS_CREATED]} created, "
+                 f"{summary[PROVISION_STATUS_EXISTING]} existing, {summary[PROVISION_STATUS_FAILED]} failed, "
+                 f"{summary['users_per_s']} users/s.")
+        return summary
+    
+    def _user_attributes(self, email, attributes):
         user_attributes = [
             {
                 'Name': 'email_verified',
@@ -120,15 +289,4 @@ class Cognito:
                 'Name': 'custom:' + key,
                 'Value': attributes[key]
             })
-            
-        COGNITO.admin_create_user(
-            UserPoolId=self.pool_id,
-            Username=email,
-            UserAttributes=user_attributes
-        )
-        
-        COGNITO.admin_add_user_to_group(
-            UserPoolId=self.pool_id,
-            Username=email,
-            GroupName=user_group
-        )
\ No newline at end of file
+        return user_attributes
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+# LOGGER
+log = logging.getLogger()
+
+JWKS_FILE = os.environ.get("COGNITO_JWKS_FILE", "")
+JWKS_URL = os.environ.get("COGNITO_JWKS_URL", "")
+ISSUER = os.environ.get("COGNITO_ISSUER", "")
+CLIENT_IDS = [
+    client_id.strip()
+    for client_id in os.environ.get("COGNITO_CLIENT_IDS", "").split(",")
+    if client_id.strip()
+]
+JWKS_MIN_REFRESH_INTERVAL = int(os.environ.get("JWKS_MIN_REFRESH_INTERVAL", 60))
+JWKS_TIMEOUT = int(os.environ.get("JWKS_TIMEOUT", 5))
+ALGORITHMS = ["RS256"]
+GROUPS_CLAIM = "cognito:groups"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class JwksCache:
+    """JWKS Cache:
+    Holds the signing keys of the user pool for the life of the container. The
+    key set is loaded again when a token names an unknown kid, at most once
+    every min_refresh_interval seconds.
+    """
+    def __init__(self, jwks_file=None, jwks_url=None, min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL):
+        self.jwks_file = jwks_file
+        self.jwks_url = jwks_url
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def get_key(self, kid):
+        """
+        Returns the JWK for the kid, refreshing the key set if the kid is unknown
+        Args:
+            kid: STR, key id from the token header
+        Returns:
+            key: DICT, JWK
+        """
+        key = self._keys.get(kid)
+        if key is None:
+            with self._lock:
+                key = self._keys.get(kid)
+                if key is None and self._can_refresh():
+                    self._refresh()
+                    key = self._keys.get(kid)
+        if key is None:
+            raise InvalidToken(f"Unknown signing key {kid}")
+        return key
+
+    def _can_refresh(self):
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.min_refresh_interval
+        )
+
+    def _refresh(self):
+        self._loaded_at = time.monotonic()
+        if self.jwks_file:
+            with open(self.jwks_file) as jwks_file:
+                jwks = json.load(jwks_file)
+        elif self.jwks_url:
+            with urllib.request.urlopen(self.jwks_url, timeout=JWKS_TIMEOUT) as response:
+                jwks = json.load(response)
+        else:
+            raise InvalidToken("COGNITO_JWKS_FILE or COGNITO_JWKS_URL has to be configured")
+        self._keys = {key["kid"]: key for key in jwks.get("keys", [])}
+        log.info("AUTH: Loaded %s signing keys.", len(self._keys))
+
+
+JWKS = JwksCache(JWKS_FILE, JWKS_URL)
+
+
+def verify_access_token(access_token, jwks=None, issuer=None, client_ids=None):
+    """Verify a Cognito access token offline: signature against the JWKS, exp, iss,
+    token_use and client_id
+    Args:
+        access_token: STR, access token
+        jwks: JwksCache, defaults to the container wide JWKS
+        issuer: STR, expected iss, defaults to COGNITO_ISSUER
+        client_ids: LIST, accepted client ids, defaults to COGNITO_CLIENT_IDS
+    Returns:
+        claims: DICT, verified token claims
+    """
+    # python-jose is only needed by functions verifying tokens locally
+    from jose import JOSEError, jwt
+
+    jwks = jwks or JWKS
+    issuer = issuer if issuer is not None else ISSUER
+    client_ids = client_ids if client_ids is not None else CLIENT_IDS
+    if not issuer or not client_ids:
+        raise InvalidToken("COGNITO_ISSUER and COGNITO_CLIENT_IDS have to be configured")
+
+    try:
+        header = jwt.get_unverified_header(access_token)
+        claims = jwt.decode(
+            access_token,
+            jwks.get_key(header.get("kid")),
+            algorithms=ALGORITHMS,
+            issuer=issuer,
+            # Access tokens carry client_id instead of aud
+            options={"verify_aud": False},
+        )
+    except JOSEError as e:
+        raise InvalidToken(str(e))
+
+    if claims.get("token_use") != "access":
+        raise InvalidToken("Not an access token")
+    if claims.get("client_id") not in client_ids:
+        raise InvalidToken(f"Unexpected client_id {claims.get('client_id')}")
+    return claims
+
+
+def get_cred_data(claims):
+    """Build cred_data from verified claims. Access tokens do not carry the custom
+    user attributes that get_user returns, only the username, sub and groups.
+    Args:
+        claims: DICT, verified token claims
+    Returns:
+        cred_data: DICT, {"username", "sub", "role"}
+    """
+    groups = claims.get(GROUPS_CLAIM, [])
+    return {
+        "username": claims.get("username", ""),
+        "sub": claims.get("sub", ""),
+        "role": groups[0] if groups else "",
+    }
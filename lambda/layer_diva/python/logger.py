@@ -1,16 +1,110 @@
+import os
+import random
+import reprlib
+import zlib
+from functools import wraps
 from typing import Callable
 from aws_lambda_powertools import Logger
 
 
 log = Logger()
 
+# Payload logging: LOG_IO_FUNCTIONS is a comma separated list of function names (or *)
+# wrapped by log_io, payloads are logged for LOG_PAYLOAD_SAMPLE_RATE of the requests and
+# always for the correlation ids in LOG_PAYLOAD_CORRELATION_IDS
+LOG_IO_FUNCTIONS = frozenset(
+    name.strip() for name in os.environ.get("LOG_IO_FUNCTIONS", "").split(",") if name.strip()
+)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+LOG_PAYLOAD_CORRELATION_IDS = frozenset(
+    cid.strip() for cid in os.environ.get("LOG_PAYLOAD_CORRELATION_IDS", "").split(",") if cid.strip()
+)
+LOG_PAYLOAD_MAX_BYTES = int(os.environ.get("LOG_PAYLOAD_MAX_BYTES", 1024))
+SAMPLE_BUCKETS = 10000
+
+_repr = reprlib.Repr()
+_repr.maxstring = LOG_PAYLOAD_MAX_BYTES
+_repr.maxother = LOG_PAYLOAD_MAX_BYTES
+_repr.maxlevel = 4
+_repr.maxdict = _repr.maxlist = _repr.maxtuple = _repr.maxset = 50
+
+
+class LazyRepr:
+    """Lazy Repr:
+    Formats the value only when the log record is emitted, truncated to max_bytes
+    """
+    __slots__ = ("value", "max_bytes")
+
+    def __init__(self, value, max_bytes=None):
+        self.value = value
+        self.max_bytes = max_bytes or LOG_PAYLOAD_MAX_BYTES
+
+    def __str__(self):
+        return truncate(_repr.repr(self.value), self.max_bytes)
+
+    __repr__ = __str__
+
+
+def truncate(text: str, max_bytes: int) -> str:
+    """Cut text to at most max_bytes of UTF-8, marking how much was dropped
+    Args:
+        text: STR, text to be cut
+        max_bytes: INT, byte budget
+    Returns:
+        text: STR, text within the byte budget
+    """
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", "ignore") + f"...[{len(encoded) - max_bytes} bytes truncated]"
+
+
+def is_payload_sampled(correlation_id=None) -> bool:
+    """Whether payloads of the current request are logged. A request with a correlation
+    id is sampled by its hash, so every record of one request makes the same decision
+    Args:
+        correlation_id: STR, defaults to the correlation id injected into the logger
+    Returns:
+        sampled: BOOL
+    """
+    correlation_id = correlation_id or log.get_correlation_id()
+    if correlation_id and correlation_id in LOG_PAYLOAD_CORRELATION_IDS:
+        return True
+    if LOG_PAYLOAD_SAMPLE_RATE <= 0:
+        return False
+    if LOG_PAYLOAD_SAMPLE_RATE >= 1:
+        return True
+    if correlation_id:
+        bucket = zlib.crc32(correlation_id.encode("utf-8")) % SAMPLE_BUCKETS
+    else:
+        bucket = random.randrange(SAMPLE_BUCKETS)
+    return bucket < LOG_PAYLOAD_SAMPLE_RATE * SAMPLE_BUCKETS
+
+
+def log_event(event: dict, logger: Logger = None):
+    """Sampled, size capped replacement of inject_lambda_context(log_event=True)
+    Args:
+        event: DICT, lambda event
+        logger: Logger, defaults to the layer logger
+    """
+    if is_payload_sampled():
+        (logger or log).info("Event: %s", LazyRepr(event))
+
 
 def log_io(func: Callable):
+    # Functions not listed in LOG_IO_FUNCTIONS only keep the error logging of log_error
+    if "*" not in LOG_IO_FUNCTIONS and func.__name__ not in LOG_IO_FUNCTIONS:
+        return log_error(func)
+
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        log.info(f"Calling function {func.__name__} with: {args} {kwargs}")
-        try: 
+        sampled = is_payload_sampled()
+        if sampled:
+            log.info("Calling function %s with: %s %s", func.__name__, LazyRepr(args), LazyRepr(kwargs))
+        try:
             res = func(*args,**kwargs)
-            log.info(f"Function {func.__name__} responded with: {res}")
+            if sampled:
+                log.info("Function %s responded with: %s", func.__name__, LazyRepr(res))
             return res
         except Exception as e:
             log.error(f"Function {func.__name__} failed with error: {e}")
@@ -19,12 +113,13 @@ def log_io(func: Callable):
     return wrapper
 
 def log_error(func: Callable):
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        try: 
+        try:
             res = func(*args,**kwargs)
             return res
         except Exception as e:
             log.error(f"Function {func.__name__} failed with error: {e}")
             raise e
 
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -5,37 +5,45 @@ from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from pynamodb.attributes import UnicodeAttribute, NumberAttribute
 
 try:
+    import aws_clients
+    import regex_registry
     import util_constants
     import util_helper
 except ImportError:
-    from layer_diva.python import util_constants, util_helper
+    from layer_diva.python import aws_clients, regex_registry, util_constants, util_helper
 
-# class BagColorWeight(GlobalSecondaryIndex):
-#     """
-#     GSI - bag-color-weight
-#     """
-#     class Meta:
-#         index_name = 'bag-color-weight'
-#         read_capacity_units = 1
-#         write_capacity_units = 1
-#         projection = AllProjection()
-#         #set to minimum read/write capacity; need to configure auto-scaling
-#     bag_id = UnicodeAttribute(hash_key=True)
-#     color = UnicodeAttribute(range_key=True)
-#     weight - NumberAttribute(range_key=True)
+regex_registry.register(
+    bag_id=util_constants.TEXT_REGEX % (100),
+    color=util_constants.STRICT_TEXT_REGEX % (50),
+    weight=util_constants.WEIGHT_REGEX,
+)
+
+
+class BagColorWeightIndex(GlobalSecondaryIndex):
+    """
+    GSI - bag-color-weight
+    """
+    class Meta:
+        index_name = 'bag-color-weight'
+        read_capacity_units = 5
+        write_capacity_units = 5
+        projection = AllProjection()
+    color = UnicodeAttribute(hash_key=True)
+    weight = NumberAttribute(range_key=True)
 
 
 class Bag(Model):
     """
     DynamoDB Table Config for Bag
     """
-    class Meta:
+    class Meta(aws_clients.ModelMeta):
         region = util_constants.REGION
         table_name = "diva-blp-bag"
         encrypted_fields = ["nric_sha"]
     bag_id = UnicodeAttribute(hash_key=True)
     color = UnicodeAttribute()
     weight = NumberAttribute()
+    color_weight_index = BagColorWeightIndex()
 
 def setup_model(tablename: Optional[str] = None):
     return util_helper.setup_model(Bag, tablename)
@@ -4,9 +4,9 @@ from pynamodb.models import Model
 from pynamodb.attributes import UnicodeAttribute, TTLAttribute, MapAttribute, NumberAttribute, ListAttribute
 
 try:
-    import util_constants, util_helper
+    import aws_clients, util_constants, util_helper
 except ImportError:
-    from layer_diva.python import util_constants, util_helper
+    from layer_diva.python import aws_clients, util_constants, util_helper
 
 class DelayMap(MapAttribute):
     """
@@ -19,7 +19,7 @@ class DelayMap(MapAttribute):
     timestamp = UnicodeAttribute(null=False)
 
 class BaggageDelay(Model):
-    class Meta:
+    class Meta(aws_clients.ModelMeta):
         region = util_constants.REGION
         table_name = "diva-pbe-baggage-delays"
         encrypted_fields = None
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 from typing import Optional
+from pynamodb.expressions.operand import Value
+from pynamodb.expressions.update import SetAction
 from pynamodb.models import Model
 from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from pynamodb.attributes import UnicodeAttribute
 
 try:
-    import util_constants, util_helper
+    import aws_clients, util_constants, util_helper
 except ImportError:
-    from layer_diva.python import util_constants, util_helper
+    from layer_diva.python import aws_clients, util_constants, util_helper
 
 class CompanyStartOfWeekIndex(GlobalSecondaryIndex):
     """
@@ -21,11 +23,34 @@ class CompanyStartOfWeekIndex(GlobalSecondaryIndex):
     company        = UnicodeAttribute(hash_key=True) 
     start_of_week  = UnicodeAttribute(range_key=True)
 
+class CompanyLocationStartOfWeekIndex(GlobalSecondaryIndex):
+    """
+    GSI - company_location-start_of_week-index, one partition per company site so
+    location queries no longer read the other sites of the company
+    """
+    class Meta:
+        index_name = 'company_location-start_of_week-index'
+        read_capacity_units = 5
+        write_capacity_units = 5
+        projection = AllProjection()
+    company_location = UnicodeAttribute(hash_key=True)
+    start_of_week    = UnicodeAttribute(range_key=True)
+
+def company_location_key(company: str, location: str) -> str:
+    # The separator is escaped in both parts, company A#B at C and company A at B#C
+    # must not share a key
+    return util_constants.KEY_SEPARATOR.join(
+        part.replace("\\", "\\\\").replace(
+            util_constants.KEY_SEPARATOR, "\\" + util_constants.KEY_SEPARATOR
+        )
+        for part in (company, location)
+    )
+
 class Booking(Model):
     """
     DynamoDB Table Config
     """
-    class Meta:
+    class Meta(aws_clients.ModelMeta):
         region = util_constants.REGION
         table_name = "diva-blp-booking"
         encrypted_fields = ["nric_sha"]
@@ -35,9 +60,36 @@ class Booking(Model):
     start_of_week   = UnicodeAttribute()
     location        = UnicodeAttribute()
     nric_sha        = UnicodeAttribute()
+    # Derived from company and location on every write, see serialize
+    company_location = UnicodeAttribute(null=True)
     company_startofweek_index  = CompanyStartOfWeekIndex()
+    company_location_startofweek_index = CompanyLocationStartOfWeekIndex()
     # BooleanAttribute() 
     # UTCDateTimeAttribute()
+
+    def serialize(self, null_check: bool = True):
+        # save, batch_write and transactions all serialize, which keeps the index key in step
+        if self.company is not None and self.location is not None:
+            self.company_location = company_location_key(self.company, self.location)
+        return super().serialize(null_check)
+
+    def update(self, actions, condition=None, **kwargs):
+        # An update of company or location sets company_location in the same request
+        paths = {str(action.values[0]): action for action in actions}
+        if {"company", "location"} & paths.keys() and "company_location" not in paths:
+            values = {}
+            for name in ("company", "location"):
+                action = paths.get(name)
+                if action is None and getattr(self, name) is not None:
+                    values[name] = getattr(self, name)
+                elif isinstance(action, SetAction) and isinstance(action.values[1], Value):
+                    values[name] = next(iter(action.values[1].value.values()))
+                else:
+                    raise ValueError(f"{name} is unknown or not set to a value, company_location cannot be derived")
+            actions = actions + [
+                Booking.company_location.set(company_location_key(values["company"], values["location"]))
+            ]
+        return super().update(actions, condition=condition, **kwargs)
     
 def setup_model(tablename: Optional[str] = None):
     return util_helper.setup_model(Booking, tablename)
\ No newline at end of file
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+try:
+    import util_constants
+except ImportError:
+    from layer_diva.python import util_constants
+
+# LOGGER
+log = logging.getLogger()
+
+MARKERS = frozenset(
+    [
+        util_constants.NA_REGEX,
+        util_constants.LIST_REGEX,
+        util_constants.OBJECT_REGEX,
+        util_constants.OBJECT_LIST_REGEX,
+    ]
+)
+UNSUPPORTED_DATA_MSG = (
+    "REQUEST: unsupported request body received. Invalid data provided for '%s'."
+)
+
+DEFAULT_PATTERNS = {
+    "location": util_constants.TEXT_REGEX % (300),
+    "company": util_constants.TEXT_REGEX % (300),
+    "capsule_id": util_constants.TEXT_REGEX % (300),
+    "activity_date": util_constants.DATE_REGEX,
+    "start_of_week": util_constants.DATE_REGEX,
+    "booking_status": r"^(%s|%s)$"
+    % (util_constants.SAMPLE_STATUS_ACTIVE, util_constants.SAMPLE_STATUS_INACTIVE),
+    "contact_num": r"^[6,8,9][0-9]{7}$",
+}
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(regex, flags=0):
+    """Compile a regex once, shared by the registry and dataclass validation
+    Args:
+        regex: STR, regex to compile
+        flags: INT, re flags
+    Returns:
+        pattern: re.Pattern, compiled pattern
+    """
+    return re.compile(regex, flags)
+
+
+class RegexRegistry:
+    """Regex Registry:
+    Immutable mapping of request field name to compiled pattern (or one of the
+    NA/LIST/OBJECT/OBJECTLIST markers). Registering patterns swaps in a new
+    mapping, so readers never see a partially updated registry.
+    """
+    def __init__(self, patterns):
+        self.patterns = MappingProxyType(self._compile(patterns))
+
+    def register(self, **patterns):
+        """
+        Add or replace field patterns, e.g. register(color=r"^[a-z]+$")
+        """
+        self.patterns = MappingProxyType({**self.patterns, **self._compile(patterns)})
+
+    def get(self, name, default=None):
+        return self.patterns.get(name, default)
+
+    def validate(self, body):
+        """
+        Validate every field of the body against its pattern, stopping at the first failure
+        Args:
+            body: DICT, request body to be validated
+        Returns:
+            valid: BOOL, whether validation passed
+        """
+        patterns = self.patterns
+        for k, value in body.items():
+            pattern = patterns.get(k)
+            if pattern == util_constants.NA_REGEX:
+                continue
+            if pattern == util_constants.LIST_REGEX:
+                list_pattern = patterns.get(k + "_list")
+                if not all(_matches(list_pattern, item, k) for item in value):
+                    return False
+            elif pattern == util_constants.OBJECT_REGEX:
+                if not self._validate_object(value):
+                    return False
+            elif pattern == util_constants.OBJECT_LIST_REGEX:
+                if not all(self._validate_object(item) for item in value):
+                    return False
+            elif not _matches(pattern, value, k):
+                return False
+
+        return True
+
+    def _validate_object(self, obj):
+        patterns = self.patterns
+        return all(_matches(patterns.get(k), value, k) for k, value in obj.items())
+
+    @staticmethod
+    def _compile(patterns):
+        return {
+            name: regex if regex in MARKERS else compile_pattern(regex, re.IGNORECASE)
+            for name, regex in patterns.items()
+        }
+
+
+def _matches(pattern, value, key_name):
+    if not isinstance(pattern, re.Pattern) or pattern.fullmatch(str(value)) is None:
+        log.warning(UNSUPPORTED_DATA_MSG, key_name)
+        return False
+    return True
+
+
+REGISTRY = RegexRegistry(DEFAULT_PATTERNS)
+register = REGISTRY.register
+validate = REGISTRY.validate
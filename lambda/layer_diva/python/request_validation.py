@@ -1,47 +1,35 @@
 from dataclasses import Field, dataclass, fields
 import os
 import re
+import base64
 import datetime
 import hashlib
-import boto3
 import json
+import time
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional
 from api_response_handler import BadRequest
 
-import util_constants, util_helper
+import aws_clients, jwt_verifier, regex_registry, stage_metrics, util_constants, util_helper
 
 # LOGGER
 log = util_helper.get_logger()
 
-COGNITO_CLIENT = boto3.client("cognito-idp")
-SSM = boto3.client("ssm")
+TOKEN_VERIFICATION_MODE = os.environ.get(
+    "TOKEN_VERIFICATION_MODE", util_constants.TOKEN_VERIFICATION_COGNITO
+)
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE = util_helper.LRUCache(
+    int(os.environ.get("TOKEN_CACHE_MAX_ITEMS", 1000)), TOKEN_CACHE_TTL
+)
 
 
 def get_regex_dict():
     """Method to return all regex dict
     Returns:
-        regex_dict: DICT, regex dictionary
+        regex_dict: DICT, regex dictionary, compiled once at import time by regex_registry
     """
-    regex_dict = {
-        "location": util_constants.TEXT_REGEX % (300),
-        "company": util_constants.TEXT_REGEX % (300),
-        "capsule_id": util_constants.TEXT_REGEX % (300),
-        "activity_date": util_constants.DATE_REGEX,
-        "start_of_week": util_constants.DATE_REGEX,
-        "booking_status": r"^(%s|%s)$"
-        % (util_constants.SAMPLE_STATUS_ACTIVE, util_constants.SAMPLE_STATUS_INACTIVE),
-        "contact_num": r"^[6,8,9][0-9]{7}$",
-    }
-
-    for key, value in regex_dict.items():
-        if (
-            value != "NA"
-            and value != util_constants.LIST_REGEX
-            and value != util_constants.OBJECT_REGEX
-            and value != util_constants.OBJECT_LIST_REGEX
-        ):
-            regex_dict[key] = re.compile(value, re.IGNORECASE)
-
-    return regex_dict
+    return dict(regex_registry.REGISTRY.patterns)
 
 
 def process_request(
@@ -79,13 +67,16 @@ def process_request(
         success, request_body = _load_request_json(request_body)
 
         # 1. validate data
-        if success and validation_method(request_body):
+        with stage_metrics.stage("parse"):
+            valid_request = success and validation_method(request_body)
+        if valid_request:
             valid = True
             cred_data = {}
             if allowed_roles:
-                valid, cred_data = _validate_token_info(
-                    allowed_roles, request_headers.get("Authorization", "")
-                )
+                with stage_metrics.stage("auth"):
+                    valid, cred_data = _validate_token_info(
+                        allowed_roles, request_headers.get("Authorization", "")
+                    )
 
             if not valid:
                 response["statusCode"] = 401
@@ -141,24 +132,7 @@ def validate_keys(request_body, expected_attr, optional_attr):
     if not _required_validation(request_body, expected_attr, optional_attr):
         return False
 
-    regex_dict = get_regex_dict()
-    for k in request_body.keys():
-        if regex_dict[k] == util_constants.NA_REGEX:
-            continue
-        if regex_dict[k] == util_constants.LIST_REGEX:
-            for item in request_body[k]:
-                if not _regex_validation(regex_dict[k + "_list"], str(item), k):
-                    return False
-        elif regex_dict[k] == util_constants.OBJECT_REGEX:
-            if not _validate_object(request_body[k], regex_dict):
-                return False
-        elif regex_dict[k] == util_constants.OBJECT_LIST_REGEX:
-            if not _validate_object_list(request_body[k], regex_dict):
-                return False
-        elif not _regex_validation(regex_dict[k], str(request_body[k]), k):
-            return False
-
-    return True
+    return regex_registry.validate(request_body)
 
 
 def _required_validation(request_body, expected_attr, optional_attr) -> bool:
@@ -174,41 +148,6 @@ def _required_validation(request_body, expected_attr, optional_attr) -> bool:
     return True
 
 
-def _validate_object(object_list: list, regex_dict: dict) -> bool:
-    for k in object_list.keys():
-        if not _regex_validation(regex_dict.get(k, None), str(object_list[k]), k):
-            return False
-    return True
-
-
-def _validate_object_list(object_list: list, regex_dict: dict) -> bool:
-    for item in object_list:
-        for inner_k in item.keys():
-            if not _regex_validation(
-                regex_dict.get(inner_k, None), str(item[inner_k]), inner_k
-            ):
-                return False
-    return True
-
-
-def _regex_validation(
-    regex_str: str or None, string_to_be_validated: str, key_name: str
-) -> bool:
-    unsupported_data_msg = (
-        "REQUEST: unsupported request body received. Invalid data provided for '%s'."
-    )
-    if regex_str is None:
-        log.warning(unsupported_data_msg, key_name)
-        return False
-
-    single_value = re.findall(regex_str, string_to_be_validated)
-    if single_value == []:
-        # invalid data is returned
-        log.warning(unsupported_data_msg, key_name)
-        return False
-    return True
-
-
 def _validate_token_info(allowed_roles, access_token):
     """Method to validate token and return credential information.
     Args:
@@ -223,40 +162,23 @@ def _validate_token_info(allowed_roles, access_token):
             "username": "rrt_alvin_super@yopmail.com",
             "username_sha": "xxxx"
         }
+        With TOKEN_VERIFICATION_MODE local the token is verified offline and
+        cred_data only holds username, sub and role from its claims.
     """
-    cred_data = {}
-
     try:
         if access_token != "":
-            response = COGNITO_CLIENT.get_user(AccessToken=access_token)
-
-            cred_data = {}
-
-            # Processing of token
-            for attr in response.get("UserAttributes", []):
-                cred_data[attr["Name"]] = attr["Value"]
-
-            ssm_response = SSM.get_parameter(
-                Name="cognito_user_pool_id", WithDecryption=False
-            )
-            cognito_user_pool_id = ssm_response.get("Parameter", {}).get("Value")
-
-            # Processing of Role
-            group_response = COGNITO_CLIENT.admin_list_groups_for_user(
-                Username=response["Username"], UserPoolId=cognito_user_pool_id
-            )
-            group_info = next(iter(group_response.get("Groups", [])), {})
-            cred_data["role"] = group_info.get("GroupName", "")
-            log.info(
-                "AUTH: User found with cognito_username: %s, role: %s."
-                % (response["Username"], cred_data["role"])
-            )
+            if TOKEN_VERIFICATION_MODE == util_constants.TOKEN_VERIFICATION_LOCAL:
+                cred_data = jwt_verifier.get_cred_data(
+                    jwt_verifier.verify_access_token(access_token)
+                )
+            else:
+                cred_data = _resolve_token(access_token)
 
             if cred_data["role"] not in allowed_roles:
                 log.warning("AUTH: Not authorized to proceed.")
                 return False, {}
 
-            return True, cred_data
+            return True, dict(cred_data)
 
     except Exception as e:
         log.error("AUTH: Access token failed: %s", e)
@@ -264,6 +186,56 @@ def _validate_token_info(allowed_roles, access_token):
     return False, {}
 
 
+def _resolve_token(access_token):
+    """Resolve an access token to its cognito attributes and role, cached until
+    the token expires or TOKEN_CACHE_TTL passes, whichever comes first
+    Args:
+        access_token: STR, access token
+    Returns:
+        cred_data: DICT, data from cognito, shared with the cache so do not modify it
+    """
+    cache_key = hashlib.sha256(bytes(access_token, "utf-8")).hexdigest()
+    cred_data = TOKEN_CACHE.get(cache_key)
+    if cred_data is not None:
+        return cred_data
+
+    response = aws_clients.client("cognito-idp").get_user(AccessToken=access_token)
+
+    cred_data = {}
+
+    # Processing of token
+    for attr in response.get("UserAttributes", []):
+        cred_data[attr["Name"]] = attr["Value"]
+
+    cognito_user_pool_id = util_helper.get_ssm_parameter("cognito_user_pool_id")
+
+    # Processing of Role
+    group_response = aws_clients.client("cognito-idp").admin_list_groups_for_user(
+        Username=response["Username"], UserPoolId=cognito_user_pool_id
+    )
+    group_info = next(iter(group_response.get("Groups", [])), {})
+    cred_data["role"] = group_info.get("GroupName", "")
+    log.info(
+        "AUTH: User found with cognito_username: %s, role: %s."
+        % (response["Username"], cred_data["role"])
+    )
+
+    ttl = min(TOKEN_CACHE_TTL, _seconds_until_expiry(access_token))
+    if ttl > 0:
+        TOKEN_CACHE.put(cache_key, cred_data, ttl=ttl)
+    return cred_data
+
+
+def _seconds_until_expiry(access_token):
+    # The signature is not checked here, Cognito has just accepted the token
+    try:
+        payload = access_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) - time.time()
+    except Exception:
+        return 0
+
+
 def _load_request_json(request_body):
     """Convert request body from string to JSON DICT, if not a valid JSON, should return False
     Args:
@@ -301,38 +273,101 @@ def _generate_sec_header(cors=None):
     return headers
 
 
+@dataclass(frozen=True)
+class _FieldPlan:
+    name: str
+    regex: Optional[str]
+    pattern: Optional[re.Pattern]
+    converter: Optional[Callable[[Any], Any]]
+
+    def parse(self, body: dict):
+        value = body.get(self.name, None)
+        if value is None:
+            return None
+        if self.pattern is not None and self.pattern.fullmatch(str(value)) is None:
+            raise BadRequest(
+                f"{value} is not a valid format for field {self.name}. It has to conform to this regex: {self.regex}"
+            )
+        if self.converter is not None:
+            return self.converter(value)
+        return value
+
+
+@dataclass(frozen=True)
+class _ValidatorPlan:
+    required_fields: frozenset
+    all_fields: frozenset
+    field_plans: tuple
+
+    def build(self, clazz: dataclass, body: dict):
+        return clazz(*[f.parse(body) for f in self.field_plans])
+
+
 def parse_event(event: dict, clazz: dataclass):
+    with stage_metrics.stage("parse"):
+        return _parse_event(event, clazz)
+
+
+def _parse_event(event: dict, clazz: dataclass):
     body = _parse_event_body(event)
-    required_fields = _get_required_class_fields(clazz)
-    all_fields = _get_all_class_fields(clazz)
-    if not all(elem in list(body.keys()) for elem in required_fields):
+    plan = _get_validator_plan(clazz)
+    if not plan.required_fields.issubset(body.keys()):
         raise BadRequest(
-            f"{event} does not contain all of these fields {required_fields}"
+            f"{event} does not contain all of these fields {_get_required_class_fields(clazz)}"
         )
-    elif any(elem not in all_fields for elem in list(body.keys())):
+    elif not plan.all_fields.issuperset(body.keys()):
         raise BadRequest(
-            f"{event} contains fields that are not expected {all_fields}"
+            f"{event} contains fields that are not expected {_get_all_class_fields(clazz)}"
         )
-    try: 
-        return clazz(*[_parse_field_from_event(f, body) for f in fields(clazz)])
+    try:
+        return plan.build(clazz, body)
     except Exception as e:
         raise BadRequest(f"Unable to parse event: {event}. Error: {e}")
 
 
-def _parse_field_from_event(f: Field, body: dict):
-    value = body.get(f.name, None)
+@lru_cache(maxsize=None)
+def _get_validator_plan(clazz: dataclass) -> _ValidatorPlan:
+    """Compile the validation plan of a dataclass once, it is reused for every request
+    Args:
+        clazz: dataclass, request dataclass to be validated
+    Returns:
+        plan: _ValidatorPlan, key sets and per field compiled patterns and converters
+    """
+    return _ValidatorPlan(
+        required_fields=frozenset(_get_required_class_fields(clazz)),
+        all_fields=frozenset(_get_all_class_fields(clazz)),
+        field_plans=tuple(_build_field_plan(f) for f in fields(clazz)),
+    )
+
+
+def _build_field_plan(f: Field) -> _FieldPlan:
     regex = f.metadata.get("regex", None)
+    registry_name = f.metadata.get("registry", None)
     date_format = f.metadata.get("date_format", None)
-    if value is None:
-        return None
-    elif date_format is not None:
-        return datetime.datetime.strptime(value, date_format)
-    elif regex is not None and re.findall(regex, value) == []:
-        raise BadRequest(
-            f"{value} is not a valid format for field {f.name}. It has to conform to this regex: {regex}"
-        )
-    else:
-        return value
+    converter = f.metadata.get("converter", None)
+    pattern = None
+    if date_format is not None:
+        # A date format takes precedence over the regex, as in the original parsing
+        regex = None
+        converter = partial(_parse_date, date_format=date_format)
+    elif regex is not None:
+        pattern = regex_registry.compile_pattern(regex)
+    elif registry_name is not None:
+        # The field shares the registry pattern of the legacy request path
+        pattern = regex_registry.REGISTRY.get(registry_name)
+        if not isinstance(pattern, re.Pattern):
+            raise ValueError(f"No pattern is registered for {registry_name} of field {f.name}")
+        regex = pattern.pattern
+    return _FieldPlan(
+        name=f.name,
+        regex=regex,
+        pattern=pattern,
+        converter=converter,
+    )
+
+
+def _parse_date(value, date_format):
+    return datetime.datetime.strptime(value, date_format)
 
 
 def _get_required_class_fields(clazz: dataclass):
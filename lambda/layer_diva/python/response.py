@@ -1,5 +1,13 @@
 from dataclasses import dataclass
 import json
+import os
+
+# Synchronous Lambda responses, API Gateway included, are capped at 6 MB. The budget of a
+# body leaves room for the headers, the envelope of a paged body and its cursor.
+LAMBDA_PAYLOAD_LIMIT = 6 * 1024 * 1024
+RESPONSE_BUDGET_BYTES = int(
+    os.environ.get("RESPONSE_BUDGET_BYTES", LAMBDA_PAYLOAD_LIMIT - 16 * 1024)
+)
 
 
 @dataclass
@@ -37,3 +45,43 @@ class ApiGwResponse:
 
     def to_json(self):
         return self.__dict__
+
+
+class JsonArrayEncoder:
+    """Json Array Encoder:
+    Encodes a JSON array one value at a time, as json.dumps would, and refuses a value
+    once the array would no longer fit max_bytes. Sizes are counted as the body takes
+    up in the Lambda response, where every quote and backslash is escaped once more.
+    """
+    SEPARATOR = ", "
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or RESPONSE_BUDGET_BYTES
+        self.count = 0
+        self.size = 2
+        self._parts = []
+        self._encoder = json.JSONEncoder()
+
+    def add(self, value) -> bool:
+        """
+        Args:
+            value: ANY, JSON serializable value
+        Returns:
+            added: BOOL, False when the value does not fit, the array is left unchanged
+        """
+        encoded = self._encoder.encode(value)
+        size = escaped_size(encoded) + (len(self.SEPARATOR) if self.count else 0)
+        if self.size + size > self.max_bytes:
+            return False
+        self._parts.append(encoded)
+        self.size += size
+        self.count += 1
+        return True
+
+    def getvalue(self) -> str:
+        return "[" + self.SEPARATOR.join(self._parts) + "]"
+
+
+def escaped_size(encoded: str) -> int:
+    """Size of ASCII JSON once embedded as a string in the Lambda response"""
+    return len(encoded) + encoded.count('"') + encoded.count("\\")
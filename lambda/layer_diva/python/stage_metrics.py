@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from aws_lambda_powertools import Logger, Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+
+# LOGGER
+log = Logger()
+
+STAGE_METRICS_ENABLED = os.environ.get("STAGE_METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.environ.get("POWERTOOLS_METRICS_NAMESPACE", "DivaBLP")
+QUERY_PATH_NONE = "none"
+
+metrics = Metrics(namespace=METRICS_NAMESPACE)
+
+_current = ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """Stage Timer:
+    Durations in milliseconds and item counts of the stages of one invocation,
+    e.g. parse, auth, query, decrypt and serialize. Stages may be recorded from
+    worker threads that run in a copy of the invocation context
+    """
+    def __init__(self, handler, clock=time.perf_counter):
+        self.handler = handler
+        self.query_path = QUERY_PATH_NONE
+        self.durations = {}
+        self.counts = {}
+        self._clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = self._clock()
+        try:
+            yield self
+        finally:
+            duration = (self._clock() - start) * 1000
+            with self._lock:
+                self.durations[name] = self.durations.get(name, 0) + duration
+
+    def count(self, name, value):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def total_ms(self):
+        return (self._clock() - self._start) * 1000
+
+    def add_to(self, metrics):
+        """
+        Add the stages to a powertools Metrics set with handler and query_path
+        dimensions, emitted as one CloudWatch Embedded Metric Format record by its log_metrics
+        """
+        metrics.add_dimension(name="handler", value=self.handler)
+        metrics.add_dimension(name="query_path", value=self.query_path)
+        for name, duration in self.durations.items():
+            metrics.add_metric(name=f"{name}_ms", unit=MetricUnit.Milliseconds, value=duration)
+        for name, value in self.counts.items():
+            metrics.add_metric(name=f"{name}_items", unit=MetricUnit.Count, value=value)
+        metrics.add_metric(name="total_ms", unit=MetricUnit.Milliseconds, value=self.total_ms())
+
+
+def timed_handler(handler_name):
+    """Decorator timing every stage recorded while the handler runs and emitting
+    them when it returns. Apply outside api_response_handler so serialize is timed.
+    Args:
+        handler_name: STR, value of the handler dimension
+    """
+    def decorator(func):
+        if not STAGE_METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        @metrics.log_metrics
+        def wrapper(event, context):
+            with record(handler_name) as timer:
+                try:
+                    return func(event, context)
+                finally:
+                    try:
+                        timer.add_to(metrics)
+                    except Exception as e:
+                        log.warning(f"Unable to add stage metrics: {e}")
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def record(handler_name, clock=time.perf_counter):
+    """Collect the stages recorded inside the block into a new StageTimer, without
+    emitting them, e.g. for benchmarks
+    Args:
+        handler_name: STR, value of the handler dimension
+        clock: FUNC, returns seconds
+    """
+    timer = StageTimer(handler_name, clock=clock)
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current invocation, a no-op outside timed_handler
+    Args:
+        name: STR, stage name, e.g. query
+    """
+    timer = _current.get()
+    if timer is None:
+        yield None
+        return
+    with timer.stage(name):
+        yield timer
+
+
+def count(name, value):
+    """Add to the item count of a stage of the current invocation
+    Args:
+        name: STR, stage name, e.g. query
+        value: INT, number of items
+    """
+    timer = _current.get()
+    if timer is not None:
+        timer.count(name, value)
+
+
+def set_query_path(query_path):
+    """Set the query_path dimension of the current invocation
+    Args:
+        query_path: STR, e.g. capsule, gsi or scan
+    """
+    timer = _current.get()
+    if timer is not None:
+        timer.query_path = query_path
+
+
+def current():
+    """
+    Returns:
+        timer: StageTimer, timer of the current invocation, None outside timed_handler
+    """
+    return _current.get()
@@ -8,6 +8,9 @@ NUM_REGEX = r'^\d{1,%s}$'
 TEXT_REGEX = r'^([\w\s!@#$%%^&*()+\-=\[\]{};:"\|,.<>\/?\'"]{1,%s})$'
 STRICT_TEXT_REGEX = r'^([\w\s()+\-:",.?\'"]{1,%s})$'
 DATE_REGEX = r'^(\d{4}-\d{2}-\d{2})$'
+PAGE_LIMIT_REGEX = r'^([1-9]\d{0,2}|1000)$'
+WEIGHT_REGEX = r'^(\d{1,6}(\.\d{1,3})?)$'
+CURSOR_REGEX = r'^([A-Za-z0-9_\-=]{1,4096})$'
 NA_REGEX = "NA"
 LIST_REGEX = "LIST"
 OBJECT_REGEX = "OBJECT"
@@ -17,10 +20,34 @@ OBJECT_LIST_REGEX = "OBJECTLIST"
 REGION = "ap-southeast-1"
 DDB_BOOKING = "diva-blp-booking"
 
+########## Encryption ############
+ENCRYPTION_MODE_KMS = "kms"
+ENCRYPTION_MODE_ENVELOPE = "envelope"
+ENVELOPE_PREFIX = "env1:"
+DATA_KEY_SPEC = "AES_256"
+GCM_NONCE_BYTES = 12
+GCM_TAG_BYTES = 16
+
 ########## Status ############
 SAMPLE_STATUS_ACTIVE = 'Active'
 SAMPLE_STATUS_INACTIVE = 'Inactive'
 
+########## Token Verification ##########
+TOKEN_VERIFICATION_COGNITO = 'cognito'
+TOKEN_VERIFICATION_LOCAL = 'local'
+
+########## Composite Keys ##########
+KEY_SEPARATOR = '#'
+
+########## Query Path ##########
+QUERY_PATH_CAPSULE = 'capsule'
+QUERY_PATH_CAPSULES = 'capsules'
+QUERY_PATH_BATCH_GET = 'batch_get'
+QUERY_PATH_GSI = 'gsi'
+QUERY_PATH_GSI_LOCATION = 'gsi_location'
+QUERY_PATH_SCAN = 'scan'
+QUERY_PATH_BATCH_WRITE = 'batch_write'
+
 ########## Cognito User Groups ##########
 COGNITO_ADMIN = 'admin'
 COGNITO_SUPERVISOR = 'supervisor'
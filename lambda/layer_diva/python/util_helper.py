@@ -1,3 +1,6 @@
+# Annotations stay unevaluated, pynamodb is only imported for type checking
+from __future__ import annotations
+
 from dataclasses import asdict, dataclass
 from enum import Enum
 import logging
@@ -5,14 +8,26 @@ import os
 import datetime
 import time
 import base64
+import contextvars
+import hashlib
+import json
 import string
+import queue
+import random
 import secrets
-from typing import Any, List, Optional, Tuple
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
 from uuid import UUID
-from pynamodb.models import Model
-import boto3
+
+if TYPE_CHECKING:
+    from pynamodb.models import Model
 
 try:
+    import aws_clients
     import util_constants
     from response import ApiGwResponse as Response
 except ImportError:
@@ -23,14 +38,39 @@ except ImportError:
     sys.path.append(parentdir)
     sys.path.append(os.path.dirname(parentdir))
 
-    from layer_diva.python import util_constants
+    from layer_diva.python import aws_clients, util_constants
     from layer_diva.python.response import ApiGwResponse as Response
 
-DDB_CLIENT = boto3.client("dynamodb")
-DDB_RES = boto3.resource("dynamodb")
-KMS = boto3.session.Session().client("kms")
-SSM = boto3.client("ssm")
+# Clients are created on first use by aws_clients, these names are kept for callers of the layer
+LAZY_CLIENTS = {
+    "DDB_CLIENT": (aws_clients.client, "dynamodb"),
+    "DDB_RES": (aws_clients.resource, "dynamodb"),
+    "KMS": (aws_clients.client, "kms"),
+    "SSM": (aws_clients.client, "ssm"),
+}
 DATE_TIME_TO_DICT_FORMAT = "%Y-%m-%d %H:%M:%S"
+KMS_MAX_WORKERS = int(os.environ.get("KMS_MAX_WORKERS", 10))
+ENCRYPTION_MODE = os.environ.get("ENCRYPTION_MODE", util_constants.ENCRYPTION_MODE_KMS)
+DATA_KEY_MAX_AGE = int(os.environ.get("DATA_KEY_MAX_AGE", 300))
+DATA_KEY_MAX_MESSAGES = int(os.environ.get("DATA_KEY_MAX_MESSAGES", 10000))
+DECRYPT_CACHE_MAX_ITEMS = int(os.environ.get("DECRYPT_CACHE_MAX_ITEMS", 10000))
+DECRYPT_CACHE_TTL = int(os.environ.get("DECRYPT_CACHE_TTL", 300))
+DECRYPT_CACHE_MAX_BYTES = int(os.environ.get("DECRYPT_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+SSM_PARAMETER_REFRESH_INTERVAL = int(os.environ.get("SSM_PARAMETER_REFRESH_INTERVAL", 300))
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_WORKERS = int(os.environ.get("BATCH_WRITE_MAX_WORKERS", 8))
+BATCH_WRITE_MAX_RETRIES = int(os.environ.get("BATCH_WRITE_MAX_RETRIES", 8))
+BATCH_WRITE_BASE_DELAY = 0.05
+BATCH_WRITE_MAX_DELAY = 2
+CONCURRENT_QUEUE_SIZE = 1000
+CONCURRENT_POLL_INTERVAL = 0.1
+
+def __getattr__(name):
+    if name in LAZY_CLIENTS:
+        factory, service_name = LAZY_CLIENTS[name]
+        return factory(service_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_logger():
     """Returning Logger object"""
@@ -65,26 +105,339 @@ def get_ttl(days):
     """ Helper to get TTL epoch time """
     return int((get_time_now_obj() + datetime.timedelta(days=days)).timestamp())
 
-def encrypt_data(kms_key_id, field_list, fields_to_encrypt):
+class LRUCache:
+    """LRU Cache:
+    Bounded, thread safe in-memory cache with least recently used eviction,
+    a time to live per entry, a max bytes limit and hit/miss counters
+    """
+    def __init__(self, max_items, ttl, max_bytes=None, clock=time.monotonic, sizeof=sys.getsizeof):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value, or default if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        """
+        Stores the value, evicting least recently used entries when over the limits
+        Args:
+            ttl: FLOAT, seconds this entry lives, defaults to the cache ttl
+        """
+        if self.max_items <= 0:
+            return
+        size = sys.getsizeof(key) + self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_items or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_where(self, predicate):
+        """
+        Drop every entry whose key matches the predicate
+        Args:
+            predicate: FUNC, called with each key
+        Returns:
+            removed: INT, number of entries dropped
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            stats: DICT, hits, misses, items and bytes currently held
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "items": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+
+class ReadThroughCache:
+    """Read Through Cache:
+    Loads missing keys through the loader, with concurrent misses of the same key
+    coalesced into one load (single-flight). A load that overlaps an invalidation
+    is returned to its callers but not cached. Cached values are shared, callers
+    must not modify them.
+    """
+    _MISSING = object()
+
+    def __init__(self, cache, clock=time.perf_counter):
+        self.cache = cache
+        self.loads = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._hit_ms_total = 0.0
+        self._hit_ms_max = 0.0
+        self._generation = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Returns the cached value of the key, loading it on a miss
+        Args:
+            key: hashable cache key
+            loader: FUNC, called without arguments to load the value
+        Returns:
+            value: cached or loaded value
+        """
+        start = self._clock()
+        value = self.cache.get(key, self._MISSING)
+        if value is not self._MISSING:
+            elapsed_ms = (self._clock() - start) * 1000
+            with self._lock:
+                self._hit_ms_total += elapsed_ms
+                self._hit_ms_max = max(self._hit_ms_max, elapsed_ms)
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InflightLoad(self._generation)
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+            with self._lock:
+                cacheable = call.generation == self._generation
+            if cacheable:
+                self.cache.put(key, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self.loads += 1
+                del self._inflight[key]
+            call.done.set()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+        self.cache.invalidate(key)
+
+    def invalidate_where(self, predicate):
+        """
+        Drop every entry whose key matches the predicate, loads in flight are not cached
+        Args:
+            predicate: FUNC, called with each key
+        Returns:
+            removed: INT, number of entries dropped
+        """
+        with self._lock:
+            self._generation += 1
+        return self.cache.invalidate_where(predicate)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.loads = 0
+            self.coalesced = 0
+            self._hit_ms_total = 0.0
+            self._hit_ms_max = 0.0
+        self.cache.clear()
+
+    def stats(self):
+        """
+        Returns:
+            stats: DICT, LRUCache stats plus hit_rate, loads, coalesced and hit latency in ms
+        """
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        with self._lock:
+            stats.update(
+                hit_rate=round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                loads=self.loads,
+                coalesced=self.coalesced,
+                hit_ms_avg=round(self._hit_ms_total / stats["hits"], 4) if stats["hits"] else 0.0,
+                hit_ms_max=round(self._hit_ms_max, 4),
+            )
+        return stats
+
+
+class _InflightLoad:
+    __slots__ = ("generation", "done", "value", "error")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DataKeyCache:
+    """Data key cache:
+    Holds one KMS data key per KMS key id for the life of the container,
+    generating a new one once it is older than max_age seconds or has
+    encrypted max_messages values
+    """
+    def __init__(self, max_age=DATA_KEY_MAX_AGE, max_messages=DATA_KEY_MAX_MESSAGES):
+        self.max_age = max_age
+        self.max_messages = max_messages
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, kms_key_id):
+        """
+        Returns the current data key for the KMS key, rotating it when needed
+        Args:
+            kms_key_id: STR, id of the KMS key wrapping the data key
+        Returns:
+            plaintext_key: BYTES, data key used to encrypt locally
+            wrapped_key: BYTES, data key encrypted by KMS, stored with the value
+        """
+        with self._lock:
+            entry = self._keys.get(kms_key_id)
+            if entry is None or self._expired(entry):
+                response = aws_clients.client("kms").generate_data_key(
+                    KeyId=kms_key_id, KeySpec=util_constants.DATA_KEY_SPEC
+                )
+                entry = {
+                    "plaintext": response["Plaintext"],
+                    "wrapped": response["CiphertextBlob"],
+                    "created": time.monotonic(),
+                    "messages": 0,
+                }
+                self._keys[kms_key_id] = entry
+            entry["messages"] += 1
+            return entry["plaintext"], entry["wrapped"]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def _expired(self, entry):
+        return (
+            entry["messages"] >= self.max_messages
+            or time.monotonic() - entry["created"] >= self.max_age
+        )
+
+
+DATA_KEY_CACHE = DataKeyCache()
+
+
+class TokenBucket:
+    """Token Bucket:
+    Thread safe rate limiter, tokens refill at rate per second up to capacity and
+    acquire blocks until enough tokens are available
+    """
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens from the bucket, waiting for the refill if needed
+        Args:
+            tokens: INT, tokens to take
+        Returns:
+            waited: FLOAT, seconds spent waiting
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+def encrypt_data(kms_key_id, field_list, fields_to_encrypt, mode=None):
     """Encrypt selected field
     Args:
         kms_key_id: STR, id of the KMS key
         field_list: DICT, DICT to be encrypted,
             can contain fields that doesn't need encryption
         fields_to_encrypt: LIST, keys inside list of fields that need to be encrypted
+        mode: STR, ENCRYPTION_MODE_KMS or ENCRYPTION_MODE_ENVELOPE, defaults to ENCRYPTION_MODE
     Returns:
         success: BOOL, whether success
     """
+    mode = mode or ENCRYPTION_MODE
     for idx, key in enumerate(field_list):
         if key in fields_to_encrypt and field_list[key] != "":
-            encrypted = KMS.encrypt(
-                KeyId=kms_key_id,
-                Plaintext=bytes(field_list[key], "utf-8"),
-            )
-            encrypted_value = base64.b64encode(encrypted["CiphertextBlob"]).decode(
-                "utf-8"
-            )
-            field_list[key] = encrypted_value
+            if mode == util_constants.ENCRYPTION_MODE_ENVELOPE:
+                field_list[key] = _envelope_encrypt(kms_key_id, field_list[key])
+            else:
+                encrypted = aws_clients.client("kms").encrypt(
+                    KeyId=kms_key_id,
+                    Plaintext=bytes(field_list[key], "utf-8"),
+                )
+                encrypted_value = base64.b64encode(
+                    encrypted["CiphertextBlob"]
+                ).decode("utf-8")
+                field_list[key] = encrypted_value
 
 
 def decrypt_data(field_list, fields_to_decrypt):
@@ -98,10 +451,117 @@ def decrypt_data(field_list, fields_to_decrypt):
     """
     for idx, key in enumerate(field_list):
         if key in fields_to_decrypt and field_list[key] != "":
-            decrypted = KMS.decrypt(
-                CiphertextBlob=bytes(base64.b64decode(field_list[key]))
-            )["Plaintext"].decode("utf-8")
-            field_list[key] = decrypted
+            field_list[key] = _decrypt_value(field_list[key])
+
+
+DECRYPT_CACHE = LRUCache(
+    DECRYPT_CACHE_MAX_ITEMS, DECRYPT_CACHE_TTL, DECRYPT_CACHE_MAX_BYTES
+)
+SSM_PARAMETER_CACHE = LRUCache(128, SSM_PARAMETER_REFRESH_INTERVAL)
+
+
+def get_ssm_parameter(name, with_decryption=False):
+    """Get a SSM parameter, cached for the life of the container and refreshed
+    every SSM_PARAMETER_REFRESH_INTERVAL seconds
+    Args:
+        name: STR, name of the parameter
+        with_decryption: BOOL, whether to decrypt SecureString parameters
+    Returns:
+        value: STR, value of the parameter
+    """
+    cache_key = (name, with_decryption)
+    value = SSM_PARAMETER_CACHE.get(cache_key)
+    if value is None:
+        response = aws_clients.client("ssm").get_parameter(
+            Name=name, WithDecryption=with_decryption
+        )
+        value = response.get("Parameter", {}).get("Value")
+        if value is not None:
+            SSM_PARAMETER_CACHE.put(cache_key, value)
+    return value
+
+
+def _decrypt_value(value):
+    cache_key = hashlib.sha256(bytes(value, "utf-8")).hexdigest()
+    decrypted = DECRYPT_CACHE.get(cache_key)
+    if decrypted is None:
+        decrypted = _decrypt_uncached(value)
+        DECRYPT_CACHE.put(cache_key, decrypted)
+    return decrypted
+
+
+def _decrypt_uncached(value):
+    if value.startswith(util_constants.ENVELOPE_PREFIX):
+        return _envelope_decrypt(value)
+    return aws_clients.client("kms").decrypt(CiphertextBlob=bytes(base64.b64decode(value)))[
+        "Plaintext"
+    ].decode("utf-8")
+
+
+def _envelope_encrypt(kms_key_id, value):
+    from Crypto.Cipher import AES
+
+    # Layout: prefix + base64(len(wrapped key) | wrapped key | nonce | tag | ciphertext)
+    plaintext_key, wrapped_key = DATA_KEY_CACHE.get(kms_key_id)
+    cipher = AES.new(
+        plaintext_key,
+        AES.MODE_GCM,
+        nonce=secrets.token_bytes(util_constants.GCM_NONCE_BYTES),
+    )
+    ciphertext, tag = cipher.encrypt_and_digest(bytes(value, "utf-8"))
+    payload = (
+        len(wrapped_key).to_bytes(2, "big") + wrapped_key + cipher.nonce + tag + ciphertext
+    )
+    return util_constants.ENVELOPE_PREFIX + base64.b64encode(payload).decode("utf-8")
+
+
+def _envelope_decrypt(value):
+    from Crypto.Cipher import AES
+
+    payload = base64.b64decode(value[len(util_constants.ENVELOPE_PREFIX):])
+    key_end = 2 + int.from_bytes(payload[:2], "big")
+    nonce_end = key_end + util_constants.GCM_NONCE_BYTES
+    tag_end = nonce_end + util_constants.GCM_TAG_BYTES
+    cipher = AES.new(
+        _unwrap_data_key(payload[2:key_end]),
+        AES.MODE_GCM,
+        nonce=payload[key_end:nonce_end],
+    )
+    return cipher.decrypt_and_verify(
+        payload[tag_end:], payload[nonce_end:tag_end]
+    ).decode("utf-8")
+
+
+@lru_cache(maxsize=128)
+def _unwrap_data_key(wrapped_key):
+    return aws_clients.client("kms").decrypt(CiphertextBlob=wrapped_key)["Plaintext"]
+
+
+def decrypt_data_bulk(rows, fields_to_decrypt, max_workers=None):
+    """Decrypt selected fields of a whole result set on a bounded thread pool
+    Args:
+        rows: LIST, list of DICT to be decrypted in place, order is preserved
+        fields_to_decrypt: LIST, keys inside each row that need to be decrypted
+        max_workers: INT, size of the thread pool, defaults to KMS_MAX_WORKERS
+    Returns:
+        failures: DICT, index of every row that failed to decrypt mapped to its error
+    """
+    failures = {}
+    if not rows:
+        return failures
+
+    workers = max(1, min(max_workers or KMS_MAX_WORKERS, len(rows)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            _submit(executor, decrypt_data, row, fields_to_decrypt): idx
+            for idx, row in enumerate(rows)
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                failures[futures[future]] = error
+
+    return failures
 
 
 def clean_data_fields(data, field_list):
@@ -117,6 +577,35 @@ def clean_data_fields(data, field_list):
             data[k] = v.strftime(util_constants.DATETIME_FORMAT)
 
 
+def encode_cursor(last_evaluated_key):
+    """Encode a DynamoDB last evaluated key into an opaque pagination cursor
+    Args:
+        last_evaluated_key: DICT, last evaluated key returned by a query or scan
+    Returns:
+        cursor: STR, url safe cursor, None when there are no more pages
+    """
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(
+        bytes(json.dumps(last_evaluated_key, separators=(",", ":")), "utf-8")
+    ).decode("utf-8")
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor back into a DynamoDB exclusive start key
+    Args:
+        cursor: STR, cursor produced by encode_cursor
+    Returns:
+        last_evaluated_key: DICT, key to resume the query or scan from
+    """
+    last_evaluated_key = json.loads(base64.urlsafe_b64decode(bytes(cursor, "utf-8")))
+    if not isinstance(last_evaluated_key, dict) or not all(
+        isinstance(v, dict) for v in last_evaluated_key.values()
+    ):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_evaluated_key
+
+
 def generate_random_pin(length):
     """Generate random pin (Uppercase alphabets + digits only) based on length
     Args:
@@ -134,7 +623,7 @@ def batch_writer(table_name, table_data):
         table_name: STRING, name of table
         table_data: LIST, list of data to be inserted
     """
-    table = DDB_RES.Table(table_name)
+    table = aws_clients.resource("dynamodb").Table(table_name)
     with table.batch_writer() as writer:
         for item in table_data:
             writer.put_item(Item=item)
@@ -142,6 +631,171 @@ def batch_writer(table_name, table_data):
     return True
 
 
+def batch_write_items(
+    table_name,
+    items,
+    key_names,
+    max_workers=None,
+    max_retries=None,
+    base_delay=BATCH_WRITE_BASE_DELAY,
+):
+    """Write items with BatchWriteItem in chunks of 25 from several threads,
+    retrying unprocessed items with jittered exponential backoff
+    Args:
+        table_name: STRING, name of table
+        items: LIST, items in DynamoDB attribute value format, keys must be unique
+        key_names: LIST, key attribute names, used to match unprocessed items to the input
+        max_workers: INT, size of the thread pool, defaults to BATCH_WRITE_MAX_WORKERS
+        max_retries: INT, retries per chunk, defaults to BATCH_WRITE_MAX_RETRIES
+        base_delay: FLOAT, backoff base delay in seconds
+    Returns:
+        failures: DICT, index of every item that could not be written mapped to the reason
+    """
+    max_retries = BATCH_WRITE_MAX_RETRIES if max_retries is None else max_retries
+    chunks = [
+        range(start, min(start + BATCH_WRITE_SIZE, len(items)))
+        for start in range(0, len(items), BATCH_WRITE_SIZE)
+    ]
+    failures = {}
+    if not chunks:
+        return failures
+
+    workers = max(1, min(max_workers or BATCH_WRITE_MAX_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            _submit(
+                executor,
+                _write_chunk, table_name, items, chunk, key_names, max_retries, base_delay
+            )
+            for chunk in chunks
+        ]
+        for future in futures:
+            failures.update(future.result())
+
+    return failures
+
+
+def _write_chunk(table_name, items, indexes, key_names, max_retries, base_delay):
+    by_key = {_item_key(items[idx], key_names): idx for idx in indexes}
+    requests = [{"PutRequest": {"Item": items[idx]}} for idx in indexes]
+    for attempt in range(max_retries + 1):
+        if attempt:
+            # Full jitter: sleep a random time up to the exponential backoff
+            time.sleep(
+                random.uniform(0, min(BATCH_WRITE_MAX_DELAY, base_delay * 2**attempt))
+            )
+        try:
+            response = aws_clients.client("dynamodb").batch_write_item(RequestItems={table_name: requests})
+        except Exception as e:
+            return {
+                by_key[_item_key(request["PutRequest"]["Item"], key_names)]: str(e)
+                for request in requests
+            }
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return {}
+
+    return {
+        by_key[_item_key(request["PutRequest"]["Item"], key_names)]: "Unprocessed after retries"
+        for request in requests
+    }
+
+
+def _item_key(item, key_names):
+    return tuple(json.dumps(item[key], sort_keys=True) for key in key_names)
+
+
+def _submit(executor, fn, *args):
+    # Run the task in a copy of the caller's context so stages it records reach the caller's StageTimer
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def iter_concurrently(producers, limit=None, max_workers=None):
+    """Run several producers on a thread pool and stream their merged items
+    Args:
+        producers: LIST, callables that each return an iterable of items
+        limit: INT, maximum number of items to yield. OPTIONAL: If not passing, all items are yielded.
+        max_workers: INT, size of the thread pool, defaults to one thread per producer
+    Yields:
+        item: items in the order the producers return them
+    """
+    items = queue.Queue(maxsize=CONCURRENT_QUEUE_SIZE)
+    stop = threading.Event()
+    producer_done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=CONCURRENT_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(producer):
+        try:
+            for item in producer():
+                if not put(item):
+                    return
+        except Exception:
+            stop.set()
+            raise
+        finally:
+            put(producer_done)
+
+    if not producers:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(producers))
+    futures = [_submit(executor, produce, producer) for producer in producers]
+    remaining = len(producers)
+    returned = 0
+    try:
+        while remaining and (limit is None or returned < limit):
+            try:
+                item = items.get(timeout=CONCURRENT_POLL_INTERVAL)
+            except queue.Empty:
+                if stop.is_set():
+                    break
+                continue
+            if item is producer_done:
+                remaining -= 1
+                continue
+            returned += 1
+            yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+    for future in futures:
+        if future.exception() is not None:
+            raise future.exception()
+
+
+def parallel_scan(
+    model: Model,
+    total_segments: int,
+    limit: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    **scan_kwargs,
+):
+    """Scan a table as several segments concurrently and stream the merged items
+    Args:
+        model: Model, pynamodb model to scan
+        total_segments: INT, number of segments the table is split into
+        limit: INT, maximum number of items to yield. OPTIONAL: If not passing, all items are yielded.
+        max_workers: INT, size of the thread pool, defaults to total_segments
+        scan_kwargs: DICT, any further arguments accepted by Model.scan
+    Returns:
+        items: GENERATOR, items in the order the segments return them
+    """
+    producers = [
+        partial(model.scan, segment=segment, total_segments=total_segments, **scan_kwargs)
+        for segment in range(total_segments)
+    ]
+    return iter_concurrently(producers, limit=limit, max_workers=max_workers)
+
+
 def setup_model(model: Model, table_name: Optional[str] = None):
     if table_name is not None:
         model.Meta.table_name = table_name
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+One-off backfill of Booking.company_location for rows written before the
+company_location-start_of_week-index existed. Rows without the attribute are not in
+the index, so location queries miss them until this job has run.
+
+Scans the table in parallel segments and sets company_location on every row that
+lacks it, conditional on company and location being unchanged. Safe to run again.
+
+Usage from the repository root:
+    python -m scripts.backfill_booking_index [--segments 4] [--max-workers 8]
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from pynamodb.exceptions import UpdateError
+
+# LOGGER
+log = logging.getLogger()
+
+BACKFILL_SEGMENTS = int(os.environ.get("BACKFILL_SEGMENTS", 4))
+BACKFILL_MAX_WORKERS = int(os.environ.get("BACKFILL_MAX_WORKERS", 8))
+BACKFILL_CHUNK_SIZE = 1000
+BACKFILL_ATTRIBUTES = ["capsule_id", "activity_date", "company", "location"]
+STATUS_UPDATED = "updated"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def backfill(segments=None, max_workers=None):
+    """Set company_location on every booking that lacks it
+    Args:
+        segments: INT, parallel scan segments, defaults to BACKFILL_SEGMENTS
+        max_workers: INT, concurrent updates, defaults to BACKFILL_MAX_WORKERS
+    Returns:
+        summary: DICT, {"scanned", "updated", "skipped", "failed"}
+    """
+    util_helper = importlib.import_module("util_helper")
+    Booking = importlib.import_module("models.booking").Booking
+    bookings = util_helper.parallel_scan(
+        Booking,
+        segments or BACKFILL_SEGMENTS,
+        filter_condition=Booking.company_location.does_not_exist(),
+        attributes_to_get=BACKFILL_ATTRIBUTES,
+    )
+    summary = {"scanned": 0, STATUS_UPDATED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+    with ThreadPoolExecutor(max_workers=max_workers or BACKFILL_MAX_WORKERS) as executor:
+        # Updates are submitted a chunk at a time so the scan is never held in memory
+        while True:
+            chunk = list(islice(bookings, BACKFILL_CHUNK_SIZE))
+            if not chunk:
+                break
+            for status in executor.map(_backfill_booking, chunk):
+                summary["scanned"] += 1
+                summary[status] += 1
+            log.info("BACKFILL: %s", summary)
+
+    log.info("BACKFILL: done %s", summary)
+    return summary
+
+
+def _backfill_booking(booking):
+    booking_module = importlib.import_module("models.booking")
+    Booking = booking_module.Booking
+    if booking.company is None or booking.location is None:
+        return STATUS_SKIPPED
+    try:
+        booking.update(
+            actions=[
+                Booking.company_location.set(
+                    booking_module.company_location_key(booking.company, booking.location)
+                )
+            ],
+            # A concurrent write has already set the key from newer values
+            condition=(Booking.company == booking.company)
+            & (Booking.location == booking.location)
+            & Booking.company_location.does_not_exist(),
+        )
+        return STATUS_UPDATED
+    except UpdateError as e:
+        if e.cause_response_code == "ConditionalCheckFailedException":
+            return STATUS_SKIPPED
+        log.error(
+            "BACKFILL: unable to update %s %s: %s",
+            booking.capsule_id,
+            booking.activity_date,
+            e,
+        )
+        return STATUS_FAILED
+
+
+if __name__ == "__main__":
+    from tests.deploy_layers import DeployLambdaLayers
+
+    DeployLambdaLayers(["layer_diva"])
+    parser = argparse.ArgumentParser(description="Backfill Booking.company_location")
+    parser.add_argument("--segments", type=int)
+    parser.add_argument("--max-workers", type=int)
+    args = parser.parse_args()
+    print(json.dumps(backfill(args.segments, args.max_workers), indent=2))
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk Cognito user provisioning, an operator script run outside Lambda.
+
+Reads users from a CSV file with a header row of email, user_group and any custom
+attributes, e.g.
+
+    email,user_group,company
+    alvin@yopmail.com,supervisor,Certis
+
+Provisioned emails are appended to the checkpoint file, an interrupted run started
+again with the same checkpoint skips them.
+
+Usage from the repository root:
+    python -m scripts.provision_users --pool-id <user pool id> --checkpoint users.done users.csv
+"""
+import argparse
+import csv
+import importlib
+import json
+import logging
+import os
+import threading
+
+# LOGGER
+log = logging.getLogger()
+
+CSV_DELIMITER = ","
+CSV_QUOTECHAR = "|"
+REQUIRED_COLUMNS = ["email", "user_group"]
+
+
+def read_users_csv(filename):
+    """Read users from a CSV file, in the dialect of tests.utils.load_csv
+    Args:
+        filename: STR, path of the CSV file
+    Returns:
+        users: LIST, DICT of email, user_group and attributes per row
+    """
+    with open(filename, newline="") as csvfile:
+        rows = list(csv.reader(csvfile, delimiter=CSV_DELIMITER, quotechar=CSV_QUOTECHAR))
+    header = [column.strip() for column in rows[0]] if rows else []
+    if not set(REQUIRED_COLUMNS).issubset(header):
+        raise ValueError(f"{filename} has to start with a header row containing {REQUIRED_COLUMNS}")
+
+    users = []
+    for row in rows[1:]:
+        if not any(value.strip() for value in row):
+            continue
+        values = dict(zip(header, (value.strip() for value in row)))
+        users.append({
+            "email": values.pop("email"),
+            "user_group": values.pop("user_group"),
+            "attributes": {key: value for key, value in values.items() if value != ""},
+        })
+    return users
+
+
+class Checkpoint:
+    """Checkpoint:
+    Append only file of provisioned emails, written as each user completes so an
+    interrupted run loses at most the users in flight
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self.done = set()
+        if filename and os.path.exists(filename):
+            with open(filename) as checkpoint_file:
+                self.done = {line.strip() for line in checkpoint_file if line.strip()}
+
+    def record(self, user, status, error):
+        if status == importlib.import_module("cognito_cls").PROVISION_STATUS_FAILED or not self.filename:
+            return
+        with self._lock:
+            with open(self.filename, "a") as checkpoint_file:
+                checkpoint_file.write(user["email"] + "\n")
+            self.done.add(user["email"])
+
+
+def provision_users(pool_id, filename, checkpoint_file=None, max_workers=None, create_rate=None, group_rate=None):
+    """Provision the users of a CSV file, skipping those already in the checkpoint
+    Args:
+        pool_id: STR, Cognito user pool id
+        filename: STR, path of the CSV file
+        checkpoint_file: STR, path of the checkpoint file, OPTIONAL
+        max_workers: INT, users provisioned concurrently, OPTIONAL
+        create_rate: FLOAT, admin_create_user calls per second, OPTIONAL
+        group_rate: FLOAT, admin_add_user_to_group calls per second, OPTIONAL
+    Returns:
+        summary: DICT, Cognito.create_users summary with the number of skipped users
+    """
+    checkpoint = Checkpoint(checkpoint_file)
+    users = read_users_csv(filename)
+    pending = [user for user in users if user["email"] not in checkpoint.done]
+    log.info(f"COGNITO: {len(users) - len(pending)} of {len(users)} users already provisioned.")
+
+    cognito_cls = importlib.import_module("cognito_cls")
+    summary = cognito_cls.Cognito(pool_id).create_users(
+        pending,
+        max_workers=max_workers,
+        create_rate=create_rate,
+        group_rate=group_rate,
+        on_result=checkpoint.record,
+    )
+    summary["skipped"] = len(users) - len(pending)
+    return summary
+
+
+if __name__ == "__main__":
+    from tests.deploy_layers import DeployLambdaLayers
+
+    DeployLambdaLayers(["layer_diva"])
+    parser = argparse.ArgumentParser(description="Provision Cognito users from a CSV file")
+    parser.add_argument("filename")
+    parser.add_argument("--pool-id", required=True)
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--create-rate", type=float)
+    parser.add_argument("--group-rate", type=float)
+    args = parser.parse_args()
+    print(json.dumps(provision_users(
+        args.pool_id,
+        args.filename,
+        checkpoint_file=args.checkpoint,
+        max_workers=args.max_workers,
+        create_rate=args.create_rate,
+        group_rate=args.group_rate,
+    ), indent=2))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of request_validation.parse_event with and without the memoised validator plan.
+
+Run from the repository root:
+    python -m tests.benchmarks.bench_parse_event
+"""
+import json
+import os
+import sys
+import timeit
+
+from tests.deploy_layers import DeployLambdaLayers
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-1")
+DeployLambdaLayers(["layer_diva"])
+sys.path.append(os.path.abspath("lambda/divaBLPGetBookings"))
+
+import request_validation  # noqa: E402
+from booking_input import BookingInput  # noqa: E402
+
+EVENT = {
+    "body": json.dumps(
+        {"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"}
+    )
+}
+NUMBER = 20000
+
+
+def parse_uncached():
+    request_validation._get_validator_plan.cache_clear()
+    return request_validation.parse_event(EVENT, BookingInput)
+
+
+def parse_cached():
+    return request_validation.parse_event(EVENT, BookingInput)
+
+
+def main():
+    results = {}
+    for name, func in [("uncached_plan", parse_uncached), ("cached_plan", parse_cached)]:
+        func()
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        results[name] = {"us_per_call": round(seconds / NUMBER * 1e6, 3)}
+
+    results["speedup"] = round(
+        results["uncached_plan"]["us_per_call"] / results["cached_plan"]["us_per_call"], 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of divaBLPGetBookings.lambda_handler per query path and table size, on the
+moto DynamoDB/KMS fixtures of tests/conftest.py.
+
+Skipped unless RUN_BENCHMARKS is set. Run from the repository root:
+    RUN_BENCHMARKS=1 python -m pytest -q tests/benchmarks/test_bench_get_bookings.py
+
+BENCH_SIZES (default 1000,10000,100000), BENCH_ITERATIONS (default 10) and
+BENCH_OUTPUT (default bench_get_bookings.json) tune the run. The output holds, per
+size and query path, p50/p95/p99 in milliseconds of the whole handler and of each
+stage (parse, query, map_to_output, decrypt, encode, serialize) and the peak memory
+of one handler call, so two commits can be compared with a JSON diff.
+"""
+import importlib
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from tests import data_generator
+
+BENCH_SIZES = [
+    int(size) for size in os.environ.get("BENCH_SIZES", "1000,10000,100000").split(",")
+]
+BENCH_ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 10))
+BENCH_OUTPUT = os.environ.get("BENCH_OUTPUT", "bench_get_bookings.json")
+PERCENTILES = [50, 95, 99]
+
+QUERY_PATHS = {
+    "capsule": {"capsule_id": "000000"},
+    "gsi": {"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"},
+    "scan": {},
+}
+
+RESULTS = {}
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks"
+)
+
+
+@pytest.fixture(scope="module")
+def get_lambda():
+    return importlib.import_module("lambda.divaBLPGetBookings.lambda_function")
+
+
+def seed_bookings(size: int):
+    loaded = data_generator.load("booking", size, kms_key_id=pytest.kms_key_id)
+    assert loaded == size
+
+
+def percentiles(samples_ms: list) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1)], 3)
+        for p in PERCENTILES
+    }
+
+
+def run_stages(get_lambda, event: dict) -> dict:
+    """One handler call split into its stages, timed by stage_metrics"""
+    stage_metrics = importlib.import_module("stage_metrics")
+    response = importlib.import_module("response")
+    request_validation = importlib.import_module("request_validation")
+
+    # Query, map_to_output, decrypt and encode interleave chunk by chunk, each stage is
+    # the sum. serialize is the API Gateway response built from the encoded body.
+    with stage_metrics.record("benchmark") as timer:
+        booking_input = request_validation.parse_event(event, get_lambda.BookingInput)
+        items, _, _ = get_lambda.load_bookings(booking_input)
+        with stage_metrics.stage("serialize"):
+            response.ApiGwResponse(200, items).to_json()
+
+    return {**timer.durations, "items": timer.counts.get("query", 0)}
+
+
+def run_handler(get_lambda, event: dict, lambda_context) -> float:
+    stage_metrics = importlib.import_module("stage_metrics")
+    with stage_metrics.record("benchmark") as timer:
+        response = get_lambda.lambda_handler(event, lambda_context)
+    assert response["statusCode"] == 200
+    return timer.total_ms()
+
+
+def peak_memory_kb(get_lambda, event: dict, lambda_context) -> float:
+    tracemalloc.start()
+    try:
+        get_lambda.lambda_handler(event, lambda_context)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def clear_caches(get_lambda):
+    # Every iteration queries and decrypts as a fresh container would
+    get_lambda.BOOKING_CACHE.clear()
+    importlib.import_module("util_helper").DECRYPT_CACHE.clear()
+
+
+@pytest.mark.parametrize("size", BENCH_SIZES)
+def test_bench_get_bookings(size, get_lambda, lambda_context, ddb_client, kms_setup, capsys):
+    seed_bookings(size)
+
+    report = {}
+    for query_path, body in QUERY_PATHS.items():
+        event = {"body": json.dumps(body)}
+        stage_samples = {}
+        handler_samples = []
+        items = 0
+        for _ in range(BENCH_ITERATIONS):
+            clear_caches(get_lambda)
+            stages = run_stages(get_lambda, event)
+            items = stages.pop("items")
+            for stage, duration in stages.items():
+                stage_samples.setdefault(stage, []).append(duration)
+            clear_caches(get_lambda)
+            handler_samples.append(run_handler(get_lambda, event, lambda_context))
+
+        clear_caches(get_lambda)
+        report[query_path] = {
+            "items": items,
+            "handler_ms": percentiles(handler_samples),
+            "stages_ms": {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+            "peak_memory_kb": peak_memory_kb(get_lambda, event, lambda_context),
+        }
+
+    RESULTS[str(size)] = report
+    with open(BENCH_OUTPUT, "w") as output:
+        json.dump({"iterations": BENCH_ITERATIONS, "sizes": RESULTS}, output, indent=2, sort_keys=True)
+
+    with capsys.disabled():
+        print(json.dumps({size: report}, indent=2))
@@ -0,0 +1,138 @@
+"""
+Cold start profiler: measures the `python -X importtime` cost of importing each lambda handler entry point.
+
+Import times depend on the machine and its load, so every profile also reports ratio: the
+handler's import time over the time of REFERENCE_IMPORT, the imports every handler pays for,
+measured in the same run.
+
+Usage from the repository root:
+    python -m tests.cold_start_profiler [handler ...]
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+LAMBDA_DIR = Path(__file__).parent.parent / "lambda"
+LAYERS = ["layer_diva"]
+ENTRY_POINT = "lambda_function"
+HANDLER_ENV = {
+    "AWS_DEFAULT_REGION": "ap-southeast-1",
+    "CORS": "*",
+    "BAG_DB_NAME": "diva-blp-bag",
+    "BOOKING_DB_NAME": "diva-blp-booking",
+    "POWERTOOLS_SERVICE_NAME": "cold-start-profiler",
+}
+REFERENCE_IMPORT = "from aws_lambda_powertools import Logger, Metrics, Tracer; import pynamodb.models"
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def list_handlers():
+    return sorted(
+        path.name
+        for path in LAMBDA_DIR.iterdir()
+        if (path / f"{ENTRY_POINT}.py").exists()
+    )
+
+
+def profile_handler(handler: str, repeat: int = 5) -> dict:
+    """Import the handler entry point in fresh interpreters and report its import cost
+    Args:
+        handler: STR, name of the lambda directory, e.g. divaBLPGetBookings
+        repeat: INT, number of cold imports to take the median of
+    Returns:
+        profile: DICT, {"handler", "total_ms", "runs_ms", "reference_ms", "ratio", "packages_ms"},
+            packages_ms holds the self time of every top level package imported by the entry point
+    """
+    # The first run also compiles bytecode, it is not a cold start of a deployed function
+    _import_once(handler)
+    runs = []
+    references = []
+    # Interleaved, so both see the same load
+    for _ in range(repeat):
+        runs.append(_import_once(handler))
+        references.append(_reference_once(handler))
+    median_run = sorted(runs, key=lambda run: run["total_ms"])[len(runs) // 2]
+    reference_ms = sorted(references)[len(references) // 2]
+    return {
+        "handler": handler,
+        "total_ms": median_run["total_ms"],
+        "runs_ms": [run["total_ms"] for run in runs],
+        "reference_ms": reference_ms,
+        "ratio": round(median_run["total_ms"] / reference_ms, 3),
+        "packages_ms": median_run["packages_ms"],
+    }
+
+
+def _import_once(handler: str) -> dict:
+    return _parse_import_time(_run_importtime(handler, f"import {ENTRY_POINT}"))
+
+
+def _reference_once(handler: str) -> float:
+    # Every top level import of the reference statement counts
+    return round(
+        sum(
+            int(match.group(2))
+            for match in map(IMPORT_TIME_LINE.match, _run_importtime(handler, REFERENCE_IMPORT).splitlines())
+            if match and len(match.group(3)) == 1
+        )
+        / 1000,
+        3,
+    )
+
+
+def _run_importtime(handler: str, statement: str) -> str:
+    env = {
+        **os.environ,
+        **HANDLER_ENV,
+        "PYTHONPATH": os.pathsep.join([str(LAMBDA_DIR / handler)] + _layer_paths()),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=LAMBDA_DIR / handler,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stderr
+
+
+def _parse_import_time(output: str) -> dict:
+    entries = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((int(self_us), int(cumulative_us), len(indent), module))
+
+    # -X importtime prints a module after everything it imported, so the entry point's
+    # imports are the lines since the previous top level import
+    end = max(i for i, entry in enumerate(entries) if entry[3] == ENTRY_POINT)
+    start = end
+    while start > 0 and entries[start - 1][2] > 1:
+        start -= 1
+
+    packages = {}
+    for self_us, _, _, module in entries[start : end + 1]:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    return {
+        "total_ms": round(entries[end][1] / 1000, 3),
+        "packages_ms": {
+            package: round(us / 1000, 3)
+            for package, us in sorted(packages.items(), key=lambda item: -item[1])
+        },
+    }
+
+
+def _layer_paths():
+    return [str(LAMBDA_DIR / layer / "python") for layer in LAYERS]
+
+
+if __name__ == "__main__":
+    handlers = sys.argv[1:] or list_handlers()
+    print(json.dumps([profile_handler(handler) for handler in handlers], indent=2))
@@ -0,0 +1,271 @@
+"""
+Synthetic data generator: skewed Booking, Bag and BaggageDelay items for load and scale tests.
+
+Items are generated as plain dicts, the fields in the model's Meta.encrypted_fields are
+envelope encrypted and the rows are bulk loaded with util_helper.batch_write_items.
+
+Usage from the repository root, against the table of the model (or --table):
+    python -m tests.data_generator booking 1000000 --kms-key-id <key id>
+"""
+import argparse
+import base64
+import datetime
+import importlib
+import itertools
+import json
+import math
+import random
+import secrets
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+try:
+    # cryptography's AES-GCM is much faster than pycryptodome's, which the layer uses
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+FIRST_DAY = datetime.date(2022, 1, 3)
+WEEKS = 52
+LOAD_CHUNK_SIZE = 10000
+
+# Hot keys first, picked with Zipf weights so a few companies, locations and
+# colors hold most of the rows
+COMPANIES = ["CAG", "Certis", "SATS", "dnata", "Jetstar", "Scoot", "Swissport", "WFS"]
+LOCATIONS = ["Airport", "Changi", "Jewel", "Seletar", "Tuas", "Jurong"]
+COLORS = ["black", "blue", "red", "grey", "green", "purple", "yellow", "white"]
+AIRLINES = ["SQ", "TR", "MI", "QF", "CX", "MH", "GA", "EK"]
+DELAY_TYPES = ["loading", "unloading", "screening", "transfer", "weather"]
+DELAY_REASONS = ["late inbound", "crew", "equipment", "manpower", "security"]
+ZIPF_EXPONENT = 1.2
+
+# Weekly spikes: every SPIKE_EVERY_WEEKS week carries SPIKE_FACTOR times the bookings,
+# and weekends are busier than weekdays
+SPIKE_EVERY_WEEKS = 4
+SPIKE_FACTOR = 5
+DAY_OF_WEEK_WEIGHTS = [1, 1, 1, 1.5, 2, 3, 2.5]
+
+BOOKINGS_PER_CAPSULE_MEAN = 8
+BAG_WEIGHT_MEDIAN_GRAMS = 15000
+BAG_WEIGHT_MAX_GRAMS = 999999
+# Delay list lengths follow a Pareto tail: most flights have a couple of delays,
+# a few have hundreds
+DELAYS_PARETO_ALPHA = 1.3
+DELAYS_MAX = 400
+DELAY_TTL_DAYS = 90
+
+
+def zipf_weights(n: int, exponent: float = ZIPF_EXPONENT) -> list:
+    return [1 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def day_weights() -> list:
+    return [
+        DAY_OF_WEEK_WEIGHTS[day % 7] * (SPIKE_FACTOR if (day // 7) % SPIKE_EVERY_WEEKS == 0 else 1)
+        for day in range(WEEKS * 7)
+    ]
+
+
+def generate_bookings(size: int, seed: int = 0) -> Iterator[dict]:
+    """Bookings grouped by capsule, each capsule on distinct days drawn with the weekly spikes
+    Args:
+        size: INT, number of bookings
+        seed: INT, random seed, the same seed generates the same rows
+    Yields:
+        booking: DICT, plain booking row
+    """
+    rng = random.Random(seed)
+    company_weights = zipf_weights(len(COMPANIES))
+    location_weights = zipf_weights(len(LOCATIONS))
+    days = list(range(WEEKS * 7))
+    weights = list(itertools.accumulate(day_weights()))
+
+    company_location_key = importlib.import_module("models.booking").company_location_key
+
+    generated = 0
+    for capsule in itertools.count():
+        company = rng.choices(COMPANIES, company_weights)[0]
+        location = rng.choices(LOCATIONS, location_weights)[0]
+        bookings = min(size - generated, 1 + int(rng.expovariate(1 / (BOOKINGS_PER_CAPSULE_MEAN - 1))))
+        for day in sorted(set(rng.choices(days, cum_weights=weights, k=bookings))):
+            activity_date = FIRST_DAY + datetime.timedelta(days=day)
+            yield {
+                "capsule_id": f"{capsule:06d}",
+                "activity_date": activity_date.isoformat(),
+                "start_of_week": (activity_date - datetime.timedelta(days=activity_date.weekday())).isoformat(),
+                "company": company,
+                "location": location,
+                "company_location": company_location_key(company, location),
+                "nric_sha": "%064x" % rng.getrandbits(256),
+            }
+            generated += 1
+        if generated >= size:
+            return
+
+
+def generate_bags(size: int, seed: int = 0) -> Iterator[dict]:
+    """Bags with Zipf skewed colors and log-normal weights in grams
+    Args:
+        size: INT, number of bags
+        seed: INT, random seed
+    Yields:
+        bag: DICT, plain bag row
+    """
+    rng = random.Random(seed)
+    color_weights = zipf_weights(len(COLORS))
+    mu = math.log(BAG_WEIGHT_MEDIAN_GRAMS)
+    for i in range(size):
+        yield {
+            "bag_id": f"BAG{i:08d}",
+            "color": rng.choices(COLORS, color_weights)[0],
+            "weight": round(min(BAG_WEIGHT_MAX_GRAMS, rng.lognormvariate(mu, 0.5)), 1),
+        }
+
+
+def generate_baggage_delays(size: int, seed: int = 0) -> Iterator[dict]:
+    """Baggage delays of hot flights, with Pareto distributed delay list lengths
+    Args:
+        size: INT, number of flights
+        seed: INT, random seed
+    Yields:
+        baggage_delay: DICT, plain baggage delay row
+    """
+    rng = random.Random(seed)
+    airline_weights = zipf_weights(len(AIRLINES))
+    start = datetime.datetime.combine(FIRST_DAY, datetime.time())
+    ttl = int((start + datetime.timedelta(days=DELAY_TTL_DAYS)).timestamp())
+    for i in range(size):
+        scheduled = start + datetime.timedelta(minutes=5 * i)
+        delays = min(DELAYS_MAX, int(rng.paretovariate(DELAYS_PARETO_ALPHA)))
+        yield {
+            "flight_no": f"{rng.choices(AIRLINES, airline_weights)[0]}{rng.randrange(1, 1000)}",
+            "scheduled_dt": scheduled.isoformat(timespec="seconds"),
+            "delays": [
+                {
+                    "delay_type": rng.choice(DELAY_TYPES),
+                    "duration": rng.randrange(1, 180),
+                    "reason": rng.choice(DELAY_REASONS),
+                    "timestamp": (scheduled + datetime.timedelta(minutes=j)).isoformat(timespec="seconds"),
+                }
+                for j in range(delays)
+            ],
+            "ttl": ttl,
+        }
+
+
+@dataclass(frozen=True)
+class Dataset:
+    module: str
+    model: str
+    generate: Callable[[int, int], Iterator[dict]]
+
+
+DATASETS = {
+    "booking": Dataset("models.booking", "Booking", generate_bookings),
+    "bag": Dataset("models.bag", "Bag", generate_bags),
+    "baggage_delay": Dataset("models.baggage_delay", "BaggageDelay", generate_baggage_delays),
+}
+
+
+def get_model(kind: str):
+    dataset = DATASETS[kind]
+    return getattr(importlib.import_module(dataset.module), dataset.model)
+
+
+def to_attribute_value(value):
+    """Convert a plain value to the DynamoDB attribute value format"""
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float)):
+        return {"N": str(value)}
+    if isinstance(value, dict):
+        return {"M": {key: to_attribute_value(v) for key, v in value.items()}}
+    if isinstance(value, list):
+        return {"L": [to_attribute_value(v) for v in value]}
+    return {"S": str(value)}
+
+
+def generate_items(kind: str, size: int, kms_key_id: Optional[str] = None, seed: int = 0) -> Iterator[dict]:
+    """Generate items ready for batch_write_items, with the model's encrypted fields
+    envelope encrypted
+    Args:
+        kind: STR, one of DATASETS
+        size: INT, number of items
+        kms_key_id: STR, KMS key of the envelope data keys, required if the model encrypts fields
+        seed: INT, random seed
+    Yields:
+        item: DICT, item in DynamoDB attribute value format
+    """
+    encrypted_fields = get_model(kind).Meta.encrypted_fields
+    if encrypted_fields and not kms_key_id:
+        raise ValueError(f"{kind} encrypts {encrypted_fields}, a kms_key_id is required")
+
+    for row in DATASETS[kind].generate(size, seed):
+        for field in encrypted_fields or []:
+            if row.get(field):
+                row[field] = envelope_encrypt(kms_key_id, row[field])
+        yield {key: to_attribute_value(value) for key, value in row.items()}
+
+
+def envelope_encrypt(kms_key_id: str, value: str) -> str:
+    """Envelope encrypt like util_helper.encrypt_data in envelope mode, with the same data
+    keys and layout, so the layer decrypts the rows. Building a pycryptodome GCM cipher
+    per value dominates generation, cryptography's AESGCM is used when it is installed.
+    """
+    util_helper = importlib.import_module("util_helper")
+    util_constants = importlib.import_module("util_constants")
+    if AESGCM is None:
+        return util_helper._envelope_encrypt(kms_key_id, value)
+
+    # Layout: prefix + base64(len(wrapped key) | wrapped key | nonce | tag | ciphertext)
+    plaintext_key, wrapped_key = util_helper.DATA_KEY_CACHE.get(kms_key_id)
+    nonce = secrets.token_bytes(util_constants.GCM_NONCE_BYTES)
+    sealed = AESGCM(plaintext_key).encrypt(nonce, bytes(value, "utf-8"), None)
+    ciphertext, tag = sealed[:-util_constants.GCM_TAG_BYTES], sealed[-util_constants.GCM_TAG_BYTES:]
+    payload = len(wrapped_key).to_bytes(2, "big") + wrapped_key + nonce + tag + ciphertext
+    return util_constants.ENVELOPE_PREFIX + base64.b64encode(payload).decode("utf-8")
+
+
+def load(kind: str, size: int, kms_key_id: Optional[str] = None, table_name: Optional[str] = None, seed: int = 0) -> int:
+    """Generate and bulk load items, LOAD_CHUNK_SIZE items at a time to bound memory
+    Args:
+        kind: STR, one of DATASETS
+        size: INT, number of items
+        kms_key_id: STR, KMS key of the envelope data keys
+        table_name: STR, defaults to the model's table
+        seed: INT, random seed
+    Returns:
+        loaded: INT, number of items written
+    """
+    util_helper = importlib.import_module("util_helper")
+    model = get_model(kind)
+    key_names = [name for name in [model._hash_keyname, model._range_keyname] if name]
+    table_name = table_name or model.Meta.table_name
+
+    items = generate_items(kind, size, kms_key_id, seed)
+    loaded = 0
+    while True:
+        chunk = list(itertools.islice(items, LOAD_CHUNK_SIZE))
+        if not chunk:
+            return loaded
+        failures = util_helper.batch_write_items(table_name, chunk, key_names)
+        if failures:
+            raise RuntimeError(f"Unable to load {len(failures)} {kind} items: {next(iter(failures.values()))}")
+        loaded += len(chunk)
+
+
+if __name__ == "__main__":
+    from tests.deploy_layers import DeployLambdaLayers
+
+    DeployLambdaLayers(["layer_diva"])
+    parser = argparse.ArgumentParser(description="Bulk load synthetic items")
+    parser.add_argument("kind", choices=sorted(DATASETS))
+    parser.add_argument("size", type=int)
+    parser.add_argument("--kms-key-id")
+    parser.add_argument("--table")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    start = datetime.datetime.now()
+    loaded = load(args.kind, args.size, args.kms_key_id, args.table, args.seed)
+    seconds = (datetime.datetime.now() - start).total_seconds()
+    print(json.dumps({"kind": args.kind, "loaded": loaded, "seconds": seconds, "items_per_s": round(loaded / seconds, 1)}))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+
+from tests.utils import dict_to_lambda_event
+
+
+@pytest.fixture(scope="class")
+def get_lambda():
+    return importlib.import_module("lambda.divaBLPGetBags.lambda_function")
+
+
+def query_bags(get_lambda, lambda_context, params):
+    response = get_lambda.lambda_handler(dict_to_lambda_event(params), lambda_context)
+    if response["statusCode"] != 200:
+        return response["statusCode"], response["body"]
+    return response["statusCode"], json.loads(response["body"])
+
+
+class TestGetBags:
+    @pytest.fixture(autouse=True)
+    def bags(self, insert_data):
+        insert_data(Path(__file__).parent / "data/test_bags.json")
+
+    @pytest.mark.parametrize(
+        "params, expected",
+        [
+            ({"color": "red"}, ["Bag1", "Bag20", "Bag21", "Bag22", "Bag23"]),
+            ({"color": "red", "weight_min": 23000}, ["Bag21", "Bag22", "Bag23"]),
+            ({"color": "red", "weight_max": "23000"}, ["Bag1", "Bag20", "Bag21"]),
+            ({"color": "red", "weight_min": 20000, "weight_max": 30000}, ["Bag21", "Bag22"]),
+            ({"color": "blue", "weight_min": 20000}, ["Bag24"]),
+            ({"color": "green"}, []),
+        ],
+    )
+    def test_weight_conditions(self, get_lambda, lambda_context, params, expected):
+        status_code, body = query_bags(get_lambda, lambda_context, params)
+
+        assert status_code == 200
+        assert [item["bag_id"] for item in body["items"]] == expected
+        assert body["next_cursor"] is None
+
+    def test_paginated(self, get_lambda, lambda_context):
+        params = {"color": "red", "weight_min": 10000, "limit": 3}
+        status_code, first_page = query_bags(get_lambda, lambda_context, params)
+        params["cursor"] = first_page["next_cursor"]
+        status_code, second_page = query_bags(get_lambda, lambda_context, params)
+
+        assert [item["bag_id"] for item in first_page["items"]] == ["Bag20", "Bag21", "Bag22"]
+        assert [item["bag_id"] for item in second_page["items"]] == ["Bag23"]
+
+    def test_default_page_limit(self, get_lambda, lambda_context, monkeypatch):
+        monkeypatch.setattr(get_lambda, "DEFAULT_PAGE_LIMIT", 2)
+        params = {"color": "red"}
+        pages = []
+        while True:
+            status_code, page = query_bags(get_lambda, lambda_context, params)
+            assert status_code == 200
+            pages.append([item["bag_id"] for item in page["items"]])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        assert pages == [["Bag1", "Bag20"], ["Bag21", "Bag22"], ["Bag23"]]
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"weight_min": 1},
+            {"color": "red", "weight_min": "heavy"},
+            {"color": "red", "weight_min": 30000, "weight_max": 20000},
+        ],
+    )
+    def test_bad_request(self, get_lambda, lambda_context, params):
+        status_code, _ = query_bags(get_lambda, lambda_context, params)
+
+        assert status_code == 400
@@ -23,6 +23,13 @@ def get_lambda():
     return importlib.import_module("lambda.divaBLPGetBookings.lambda_function")
 
 
+@pytest.fixture(autouse=True)
+def clear_booking_cache(get_lambda):
+    get_lambda.BOOKING_CACHE.clear()
+    yield
+    get_lambda.BOOKING_CACHE.clear()
+
+
 # Note: freeze_time freezes the datetime at UTC time. Thus @freeze_time("2022-01-03") actually freezes time at
 # 2022-01-03 08:00:00 GMT+8
 @freeze_time("2022-01-03")
@@ -86,6 +93,462 @@ class TestGetBookings:
         assert response["statusCode"] == 200
         assert body == response_json
 
+    def test_query_returns_projected_fields(
+        self, get_lambda, insert_data, lambda_context
+    ):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        request = {
+            "body": json.dumps(
+                {"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"}
+            ),
+        }
+
+        response = get_lambda.lambda_handler(request, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert all(set(item) == set(get_lambda.BOOKING_KEYS) for item in body)
+
+    def test_location_query_reads_only_its_site(
+        self, get_lambda, insert_data, lambda_context, ddb_client, mocker
+    ):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        get_lambda.Booking(
+            capsule_id="777777",
+            activity_date="2022-01-04",
+            start_of_week="2022-01-03",
+            company="CAG",
+            location="Jewel",
+            nric_sha="",
+        ).save()
+        location_index = mocker.spy(
+            get_lambda.Booking.company_location_startofweek_index, "query"
+        )
+
+        def fetch(body):
+            response = get_lambda.lambda_handler({"body": json.dumps(body)}, lambda_context)
+            assert response["statusCode"] == 200
+            return json.loads(response["body"])
+
+        airport = fetch({"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"})
+        jewel = fetch({"company": "CAG", "start_of_week": "2022-01-03", "location": "Jewel"})
+        every_site = fetch({"company": "CAG", "start_of_week": "2022-01-03"})
+
+        assert location_index.call_count == 2
+        assert {item["location"] for item in airport} == {"Airport"}
+        assert [item["capsule_id"] for item in jewel] == ["777777"]
+        assert len(every_site) == len(airport) + len(jewel)
+
+    def test_location_query_keeps_companies_apart(self, get_lambda, lambda_context):
+        for company, location in [("A#B", "C"), ("A", "B#C")]:
+            get_lambda.Booking(
+                capsule_id=f"{company}@{location}",
+                activity_date="2022-01-05",
+                start_of_week="2022-01-03",
+                company=company,
+                location=location,
+                nric_sha="",
+            ).save()
+
+        for company, location in [("A#B", "C"), ("A", "B#C")]:
+            request = {"company": company, "location": location, "start_of_week": "2022-01-03"}
+            response = get_lambda.lambda_handler({"body": json.dumps(request)}, lambda_context)
+            body = json.loads(response["body"])
+
+            assert response["statusCode"] == 200
+            assert [item["capsule_id"] for item in body] == [f"{company}@{location}"]
+
+    def test_scan_paginated(self, get_lambda, insert_data, lambda_context):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        response_json = load_file(
+            Path(__file__).parent / "response/booking_response.json"
+        )
+
+        items = []
+        params = {"limit": 2}
+        for _ in range(len(response_json) + 1):
+            response = get_lambda.lambda_handler(
+                {"body": json.dumps(params)}, lambda_context
+            )
+            body = json.loads(response["body"])
+
+            assert response["statusCode"] == 200
+            assert len(body["items"]) <= 2
+            items.extend(body["items"])
+            if body["next_cursor"] is None:
+                break
+            params["cursor"] = body["next_cursor"]
+
+        assert body["next_cursor"] is None
+        assert items == response_json
+
+    def test_query_paginated(self, get_lambda, insert_data, lambda_context):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        request = {
+            "company": "CAG",
+            "start_of_week": "2022-01-03",
+            "location": "Airport",
+            "limit": 1,
+        }
+
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps(request)}, lambda_context
+        )
+        first_page = json.loads(response["body"])
+        request["cursor"] = first_page["next_cursor"]
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps(request)}, lambda_context
+        )
+        second_page = json.loads(response["body"])
+
+        assert len(first_page["items"]) == 1
+        assert len(second_page["items"]) == 1
+        assert first_page["items"] != second_page["items"]
+
+    @pytest.mark.parametrize(
+        "params", [{"limit": 0}, {"limit": "ten"}, {"cursor": "bm90LWpzb24="}]
+    )
+    def test_bad_pagination_params(self, get_lambda, lambda_context, params):
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps(params)}, lambda_context
+        )
+        assert response["statusCode"] == 400
+
+    def test_cursor_of_another_query_path(self, get_lambda, insert_data, lambda_context):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps({"limit": 1})}, lambda_context
+        )
+        scan_cursor = json.loads(response["body"])["next_cursor"]
+
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps({"company": "CAG", "start_of_week": "2022-01-03", "cursor": scan_cursor})},
+            lambda_context,
+        )
+
+        assert scan_cursor is not None
+        assert response["statusCode"] == 400
+
+    def test_emits_stage_metrics(self, get_lambda, insert_data, lambda_context, capsys):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        capsys.readouterr()
+        request = {"body": json.dumps({"capsule_id": "888888"})}
+
+        response = get_lambda.lambda_handler(request, lambda_context)
+
+        records = [
+            json.loads(line)
+            for line in capsys.readouterr().out.splitlines()
+            if '"_aws"' in line
+        ]
+        assert response["statusCode"] == 200
+        assert len(records) == 1
+        assert records[0]["handler"] == "divaBLPGetBookings"
+        assert records[0]["query_path"] == "capsule"
+        for metric in ["parse_ms", "query_ms", "map_to_output_ms", "decrypt_ms", "encode_ms", "serialize_ms", "total_ms"]:
+            assert records[0][metric][0] >= 0
+        assert records[0]["query_items"] == [len(json.loads(response["body"]))]
+
+    def test_read_through_cache(self, get_lambda, insert_data, lambda_context, mocker):
+        insert_data(
+            Path(__file__).parent / "data/test_booking.json",
+            {"diva-blp-booking": ["nric_sha"]},
+        )
+        query = mocker.spy(get_lambda, "find_relevant_bookings")
+        capsule = {"body": json.dumps({"capsule_id": "888888"})}
+        gsi = {
+            "body": json.dumps(
+                {"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"}
+            )
+        }
+
+        first = get_lambda.lambda_handler(capsule, lambda_context)
+        second = get_lambda.lambda_handler(capsule, lambda_context)
+        get_lambda.lambda_handler(gsi, lambda_context)
+        gsi_response = get_lambda.lambda_handler(gsi, lambda_context)
+
+        assert first["statusCode"] == gsi_response["statusCode"] == 200
+        assert second["body"] == first["body"]
+        assert query.call_count == 2
+        stats = get_lambda.BOOKING_CACHE.stats()
+        assert stats["hits"] == 2
+        assert stats["hit_rate"] == 0.5
+
+        booking = {"company": "SATS", "start_of_week": "2022-01-03", "location": "Airport"}
+        assert get_lambda.invalidate_bookings(capsule_id="888888", **booking) == 1
+        get_lambda.lambda_handler(capsule, lambda_context)
+        get_lambda.lambda_handler(gsi, lambda_context)
+        assert query.call_count == 3
+
+        booking = {"company": "CAG", "start_of_week": "2022-01-03", "location": "Airport"}
+        assert get_lambda.invalidate_bookings(capsule_id="000000", **booking) == 1
+        get_lambda.lambda_handler(gsi, lambda_context)
+        assert query.call_count == 4
+
+    def test_cache_key_normalised(self, get_lambda):
+        booking_input = get_lambda.BookingInput
+
+        assert get_lambda.cache_key(
+            booking_input("CAG", "2022-01-03", "Airport", "888888", None, None, None, None, None, None)
+        ) == get_lambda.cache_key(booking_input(None, None, None, "888888", None, None, None, None, None, None))
+        assert get_lambda.cache_key(
+            booking_input(None, None, None, "888888", 10, None, None, None, None, None)
+        ) != get_lambda.cache_key(booking_input(None, None, None, "888888", None, None, None, None, None, None))
+
+    def test_week_range_query(self, get_lambda, lambda_context, mocker):
+        for week in ["2021-12-27", "2022-01-03", "2022-01-10", "2022-01-17", "2022-01-24"]:
+            for location in ["Airport", "Jewel"]:
+                get_lambda.Booking(
+                    capsule_id=f"{location}-{week}",
+                    activity_date=week,
+                    start_of_week=week,
+                    company="Certis",
+                    location=location,
+                    nric_sha="",
+                ).save()
+        query = mocker.spy(get_lambda.Booking.company_startofweek_index, "query")
+        week_range = {
+            "company": "Certis",
+            "start_of_week_from": "2022-01-03",
+            "start_of_week_to": "2022-01-17",
+        }
+
+        response = get_lambda.lambda_handler({"body": json.dumps(week_range)}, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert query.call_count == 1
+        assert sorted(item["activity_date"] for item in body) == [
+            "2022-01-03", "2022-01-03", "2022-01-10", "2022-01-10", "2022-01-17", "2022-01-17"
+        ]
+
+        items = []
+        params = {**week_range, "location": "Jewel", "limit": 2}
+        for _ in range(3):
+            response = get_lambda.lambda_handler({"body": json.dumps(params)}, lambda_context)
+            page = json.loads(response["body"])
+            items.extend(page["items"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+        assert sorted(item["capsule_id"] for item in items) == [
+            "Jewel-2022-01-03", "Jewel-2022-01-10", "Jewel-2022-01-17"
+        ]
+
+        # Only the range without a location holds Airport bookings, the Jewel pages stay
+        cached = get_lambda.BOOKING_CACHE.stats()["items"]
+        assert get_lambda.invalidate_bookings(
+            company="Certis", start_of_week="2022-01-10", location="Airport"
+        ) == 1
+        assert get_lambda.BOOKING_CACHE.stats()["items"] == cached - 1
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"company": "CAG", "start_of_week_from": "2022-01-03"},
+            {"company": "CAG", "start_of_week_to": "2022-01-03"},
+            {"company": "CAG", "start_of_week_from": "2022-01-10", "start_of_week_to": "2022-01-03"},
+            {"company": "CAG", "start_of_week_from": "2022-01-03", "start_of_week_to": "2023-01-02"},
+            {"company": "CAG", "start_of_week_from": "2022-01-03", "start_of_week_to": "2022-02-30"},
+            {"company": "CAG", "start_of_week": "2022-01-03", "start_of_week_from": "2022-01-03", "start_of_week_to": "2022-01-10"},
+            {"capsule_id": "888888", "start_of_week_from": "2022-01-03", "start_of_week_to": "2022-01-10"},
+        ],
+    )
+    def test_bad_week_range(self, get_lambda, lambda_context, params):
+        response = get_lambda.lambda_handler({"body": json.dumps(params)}, lambda_context)
+        assert response["statusCode"] == 400
+
+    def test_capsule_ids_query(self, get_lambda, lambda_context, mocker):
+        for capsule_id, days in [("A", ["2022-01-05", "2022-01-04"]), ("B", ["2022-01-06"])]:
+            for day in days:
+                get_lambda.Booking(
+                    capsule_id=capsule_id,
+                    activity_date=day,
+                    start_of_week="2022-01-03",
+                    company="Certis",
+                    location="Airport",
+                    nric_sha="",
+                ).save()
+        query = mocker.spy(get_lambda, "query_capsule")
+        request = {"body": json.dumps({"capsule_ids": ["B", "missing", "A", "B"]})}
+
+        response = get_lambda.lambda_handler(request, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert query.call_count == 3
+        assert [(r["capsule_id"], r["found"]) for r in body] == [
+            ("B", True), ("missing", False), ("A", True), ("B", True)
+        ]
+        assert [item["activity_date"] for item in body[2]["items"]] == ["2022-01-04", "2022-01-05"]
+        assert body[1]["items"] == []
+
+        assert get_lambda.invalidate_bookings(capsule_id="A") == 1
+        assert get_lambda.invalidate_bookings(capsule_id="C") == 0
+
+    def test_capsule_ids_batch_get(self, get_lambda, lambda_context, mocker):
+        for capsule_id in ["A", "B"]:
+            get_lambda.Booking(
+                capsule_id=capsule_id,
+                activity_date="2022-01-05",
+                start_of_week="2022-01-03",
+                company="Certis",
+                location="Airport",
+                nric_sha="",
+            ).save()
+        batch_get = mocker.spy(get_lambda.Booking, "batch_get")
+        query = mocker.spy(get_lambda, "query_capsule")
+        request = {
+            "body": json.dumps({"capsule_ids": ["B", "A", "C"], "activity_date": "2022-01-05"})
+        }
+
+        response = get_lambda.lambda_handler(request, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert batch_get.call_count == 1
+        assert query.call_count == 0
+        assert [(r["capsule_id"], len(r["items"])) for r in body] == [("B", 1), ("A", 1), ("C", 0)]
+        assert body[2]["found"] is False
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"capsule_ids": []},
+            {"capsule_ids": "888888"},
+            {"capsule_ids": [888888]},
+            {"capsule_ids": [str(i) for i in range(51)]},
+            {"capsule_ids": ["888888"], "capsule_id": "888888"},
+            {"capsule_ids": ["888888"], "company": "CAG"},
+            {"capsule_ids": ["888888"], "start_of_week": "2022-01-03"},
+            {"capsule_ids": ["888888"], "start_of_week_from": "2022-01-03"},
+            {"capsule_ids": ["888888"], "start_of_week_to": "2022-01-10"},
+            {"capsule_ids": ["888888"], "limit": 10},
+            {"capsule_ids": ["888888"], "activity_date": "2022/01/05"},
+            {"capsule_id": "888888", "activity_date": "2022-01-05"},
+        ],
+    )
+    def test_bad_capsule_ids(self, get_lambda, lambda_context, params):
+        response = get_lambda.lambda_handler({"body": json.dumps(params)}, lambda_context)
+        assert response["statusCode"] == 400
+
+    @pytest.mark.parametrize(
+        "params, segments",
+        [
+            ({}, 1),
+            ({"limit": 5}, 1),
+            ({"company": "Certis", "start_of_week": "2022-01-03"}, 1),
+            ({"company": "Certis", "start_of_week": "2022-01-03", "location": "Airport"}, 1),
+        ],
+    )
+    def test_response_budget(self, get_lambda, lambda_context, monkeypatch, params, segments):
+        for i in range(7):
+            get_lambda.Booking(
+                capsule_id=f"budget-{i}",
+                activity_date="2022-01-05",
+                start_of_week="2022-01-03",
+                company="Certis",
+                location="Airport",
+                nric_sha="",
+            ).save()
+
+        def fetch_all(max_bytes=None):
+            items, pages, request = [], 0, dict(params)
+            while True:
+                response = get_lambda.lambda_handler({"body": json.dumps(request)}, lambda_context)
+                body = json.loads(response["body"])
+                assert response["statusCode"] == 200
+                if isinstance(body, list):
+                    return body, 1
+                if max_bytes:
+                    assert len(json.dumps(json.dumps(body["items"]))) - 2 <= max_bytes
+                items.extend(body["items"])
+                pages += 1
+                if body["next_cursor"] is None:
+                    return items, pages
+                request["cursor"] = body["next_cursor"]
+
+        everything, unbudgeted_pages = fetch_all()
+        get_lambda.BOOKING_CACHE.clear()
+        budget = 3 * (len(json.dumps(json.dumps(everything[0]))) - 2)
+        monkeypatch.setattr(importlib.import_module("response"), "RESPONSE_BUDGET_BYTES", budget)
+        monkeypatch.setattr(get_lambda, "STREAM_CHUNK_SIZE", 2)
+        monkeypatch.setattr(get_lambda, "SCAN_SEGMENTS", segments)
+
+        items, pages = fetch_all(budget)
+
+        assert pages > unbudgeted_pages
+        assert sorted(map(json.dumps, items)) == sorted(map(json.dumps, everything))
+
+    def test_parallel_scan_over_budget_is_flagged(self, get_lambda, lambda_context, monkeypatch, mocker):
+        for i in range(7):
+            get_lambda.Booking(
+                capsule_id=f"budget-{i}",
+                activity_date="2022-01-05",
+                start_of_week="2022-01-03",
+                company="Certis",
+                location="Airport",
+                nric_sha="",
+            ).save()
+        monkeypatch.setattr(importlib.import_module("response"), "RESPONSE_BUDGET_BYTES", 600)
+        monkeypatch.setattr(get_lambda, "SCAN_SEGMENTS", 2)
+        scan = mocker.spy(get_lambda.Booking, "scan")
+
+        response = get_lambda.lambda_handler({"body": json.dumps({})}, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert body["truncated"] is True
+        assert body["next_cursor"] is None
+        assert 0 < len(body["items"]) < 7
+        # One scan per segment, the table is not scanned again
+        assert scan.call_count == 2
+
+    def test_capsule_ids_over_budget(self, get_lambda, lambda_context, monkeypatch):
+        capsule_ids = ["A", "B", "C", "D"]
+        for capsule_id in capsule_ids:
+            get_lambda.Booking(
+                capsule_id=capsule_id,
+                activity_date="2022-01-05",
+                start_of_week="2022-01-03",
+                company="Certis",
+                location="Airport",
+                nric_sha="",
+            ).save()
+        request = {"body": json.dumps({"capsule_ids": capsule_ids})}
+        everything = json.loads(get_lambda.lambda_handler(request, lambda_context)["body"])
+        get_lambda.BOOKING_CACHE.clear()
+        entry_size = len(json.dumps(json.dumps(everything[0]))) - 2
+        monkeypatch.setattr(
+            importlib.import_module("response"), "RESPONSE_BUDGET_BYTES", 2 * entry_size + 4
+        )
+
+        response = get_lambda.lambda_handler(request, lambda_context)
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert body["truncated"] is True
+        assert body["items"] == everything[:2]
+        assert body["unprocessed_capsule_ids"] == ["C", "D"]
+
     def test_insert_bag(self, get_lambda, insert_data, lambda_context):
         #print(get_lambda)
         #print(lambda_context)
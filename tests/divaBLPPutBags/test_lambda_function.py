@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+
+from tests.utils import dict_to_lambda_event, load_file
+
+
+@pytest.fixture(scope="class")
+def get_lambda():
+    return importlib.import_module("lambda.divaBLPPutBags.lambda_function")
+
+
+def get_bag(ddb_client, bag_id):
+    return ddb_client.get_item(
+        TableName="diva-blp-bag", Key={"bag_id": {"S": bag_id}}
+    ).get("Item")
+
+
+class TestPutBags:
+    def test_bad_request_body(self, get_lambda, lambda_context):
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bad_param": []}), lambda_context
+        )
+        assert response["statusCode"] == 400
+
+    @pytest.mark.parametrize("bags", [[], "Bag1"])
+    def test_bad_bags(self, get_lambda, lambda_context, bags):
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bags": bags}), lambda_context
+        )
+        assert response["statusCode"] == 400
+
+    def test_too_many_bags(self, get_lambda, lambda_context, monkeypatch):
+        monkeypatch.setattr(get_lambda, "MAX_BAGS", 2)
+        bags = [{"bag_id": f"Bag{i}", "color": "red", "weight": 1} for i in range(3)]
+
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bags": bags}), lambda_context
+        )
+        assert response["statusCode"] == 400
+
+    def test_valid(self, get_lambda, lambda_context, ddb_client):
+        request = load_file(Path(__file__).parent / "data/test_bags.json")
+
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event(request), lambda_context
+        )
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert [result["status"] for result in body] == [
+            "created",
+            "created",
+            "duplicate",
+            "invalid",
+            "invalid",
+        ]
+        assert get_bag(ddb_client, "Bag10") == {
+            "bag_id": {"S": "Bag10"},
+            "color": {"S": "red"},
+            "weight": {"N": "23000.0"},
+        }
+        assert get_bag(ddb_client, "Bag11")["weight"] == {"N": "18500.5"}
+        assert get_bag(ddb_client, "Bag12") is None
+
+    def test_many_bags(self, get_lambda, lambda_context, ddb_client):
+        bags = [{"bag_id": f"SQ{i}", "color": "red", "weight": i} for i in range(120)]
+
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bags": bags}), lambda_context
+        )
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert all(result["status"] == "created" for result in body)
+        assert ddb_client.scan(TableName="diva-blp-bag", Select="COUNT")["Count"] == 121
+
+    def test_unprocessed_items_are_retried(
+        self, get_lambda, lambda_context, ddb_client, mocker
+    ):
+        util_helper = importlib.import_module("util_helper")
+        batch_write_item = util_helper.DDB_CLIENT.batch_write_item
+        calls = []
+
+        def throttled_batch_write_item(RequestItems):
+            calls.append(RequestItems)
+            table, requests = next(iter(RequestItems.items()))
+            if len(calls) == 1:
+                batch_write_item(RequestItems={table: requests[:1]})
+                return {"UnprocessedItems": {table: requests[1:]}}
+            return batch_write_item(RequestItems=RequestItems)
+
+        mocker.patch.object(
+            util_helper.DDB_CLIENT, "batch_write_item", throttled_batch_write_item
+        )
+        mocker.patch.object(util_helper.time, "sleep")
+        bags = [{"bag_id": f"Bag{i}", "color": "red", "weight": i} for i in range(3)]
+
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bags": bags}), lambda_context
+        )
+        body = json.loads(response["body"])
+
+        assert [result["status"] for result in body] == ["created"] * 3
+        assert len(calls) == 2
+        assert len(calls[1]["diva-blp-bag"]) == 2
+
+    def test_unprocessed_items_are_reported(
+        self, get_lambda, lambda_context, ddb_client, mocker
+    ):
+        util_helper = importlib.import_module("util_helper")
+        mocker.patch.object(
+            util_helper.DDB_CLIENT,
+            "batch_write_item",
+            lambda RequestItems: {"UnprocessedItems": RequestItems},
+        )
+        mocker.patch.object(util_helper.time, "sleep")
+        bags = [{"bag_id": f"Bag{i}", "color": "red", "weight": i} for i in range(2)]
+
+        response = get_lambda.lambda_handler(
+            dict_to_lambda_event({"bags": bags}), lambda_context
+        )
+        body = json.loads(response["body"])
+
+        assert response["statusCode"] == 200
+        assert [result["status"] for result in body] == ["failed"] * 2
+        assert body[0]["error"] == "Unprocessed after retries"
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def aws_clients():
+    aws_clients = importlib.import_module("aws_clients")
+    aws_clients.reset()
+    yield aws_clients
+    aws_clients.reset()
+
+
+class TestAwsClients:
+    def test_created_lazily_once(self, aws_clients):
+        assert aws_clients.creation_times() == {}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: aws_clients.client("kms"), range(16)))
+
+        assert all(c is clients[0] for c in clients)
+        assert list(aws_clients.creation_times()) == ["client:kms"]
+
+    def test_shared_config(self, aws_clients):
+        kms = aws_clients.client("kms")
+        cognito = aws_clients.client("cognito-idp")
+
+        assert kms.meta.config.max_pool_connections == 50
+        assert kms.meta.config.tcp_keepalive
+        assert cognito.meta.config.retries["mode"] == "standard"
+        assert cognito.meta.config.tcp_keepalive
+
+    @pytest.mark.parametrize(
+        "module, model",
+        [("models.booking", "Booking"), ("models.bag", "Bag"), ("models.baggage_delay", "BaggageDelay")],
+    )
+    def test_models_share_pool_config(self, aws_clients, module, model):
+        model = getattr(importlib.import_module(module), model)
+        config = model._get_connection().connection.client.meta.config
+
+        assert config.max_pool_connections == aws_clients.CLIENT_CONFIG["max_pool_connections"]
+        assert config.connect_timeout == aws_clients.CLIENT_CONFIG["connect_timeout"]
+        assert config.read_timeout == aws_clients.CLIENT_CONFIG["read_timeout"]
+
+    def test_util_helper_names(self, aws_clients):
+        util_helper = importlib.import_module("util_helper")
+
+        assert util_helper.KMS is aws_clients.client("kms")
+        assert util_helper.DDB_RES is aws_clients.resource("dynamodb")
+        with pytest.raises(AttributeError):
+            util_helper.UNKNOWN_CLIENT
+
+    def test_get_bookings_only_creates_kms(self, aws_clients, lambda_context):
+        get_lambda = importlib.import_module("lambda.divaBLPGetBookings.lambda_function")
+        importlib.import_module("util_helper").DECRYPT_CACHE.clear()
+
+        response = get_lambda.lambda_handler(
+            {"body": json.dumps({"capsule_id": "888888"})}, lambda_context
+        )
+
+        assert response["statusCode"] == 200
+        assert set(aws_clients.creation_times()) <= {"client:kms", "client:dynamodb"}
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+import boto3
+import pytest
+from moto import mock_cognitoidp
+
+from scripts import provision_users
+
+GROUP_MEMBERS = {
+    "supervisor": ["alvin", "bernice", "chandra"],
+    "officer": ["chandra", "dinesh", "elaine", "farid"],
+}
+
+
+@pytest.fixture
+def cognito():
+    with mock_cognitoidp():
+        aws_clients = importlib.import_module("aws_clients")
+        aws_clients.reset()
+        client = boto3.client("cognito-idp")
+        pool_id = client.create_user_pool(PoolName="diva")["UserPool"]["Id"]
+        for group, usernames in GROUP_MEMBERS.items():
+            client.create_group(GroupName=group, UserPoolId=pool_id)
+            for username in usernames:
+                try:
+                    client.admin_create_user(
+                        UserPoolId=pool_id,
+                        Username=username,
+                        UserAttributes=[{"Name": "custom:company", "Value": "Certis"}],
+                    )
+                except client.exceptions.UsernameExistsException:
+                    pass
+                client.admin_add_user_to_group(
+                    UserPoolId=pool_id, Username=username, GroupName=group
+                )
+        client.create_group(GroupName="empty", UserPoolId=pool_id)
+
+        cognito_cls = importlib.import_module("cognito_cls")
+        yield cognito_cls.Cognito(pool_id)
+        aws_clients.reset()
+
+
+class TestCognito:
+    def test_iter_users_paginates(self, cognito):
+        users = list(cognito.iter_users(page_size=2))
+
+        assert sorted(u["Username"] for u in users) == [
+            "alvin", "bernice", "chandra", "dinesh", "elaine", "farid"
+        ]
+        assert all(u["custom:company"] == "Certis" for u in users)
+        assert cognito.get_users() == list(cognito.iter_users())
+
+    def test_iter_users_in_group_paginates(self, cognito):
+        users = list(cognito.iter_users_in_group("officer", page_size=3))
+
+        assert sorted(u["Username"] for u in users) == GROUP_MEMBERS["officer"]
+        assert cognito.get_users_in_group("empty") == []
+
+    def test_users_in_groups_deduplicated(self, cognito):
+        users = cognito.get_users_in_groups(["supervisor", "officer", "empty"], max_workers=3)
+
+        assert sorted(u["Username"] for u in users) == [
+            "alvin", "bernice", "chandra", "dinesh", "elaine", "farid"
+        ]
+        assert cognito.get_users_in_groups([]) == []
+
+    def test_create_users_idempotent(self, cognito):
+        users = [
+            {"email": "alvin", "user_group": "officer", "attributes": {}},
+            {"email": "gina@yopmail.com", "user_group": "officer", "attributes": {"company": "Certis"}},
+            {"email": "hari@yopmail.com", "user_group": "missing", "attributes": {}},
+        ]
+        results = []
+
+        summary = cognito.create_users(users, on_result=lambda *result: results.append(result))
+
+        assert summary["created"] == 1
+        assert summary["existing"] == 1
+        assert summary["failed"] == 1
+        assert list(summary["errors"]) == ["hari@yopmail.com"]
+        assert len(results) == 3
+        officers = {u["Username"]: u for u in cognito.get_users_in_group("officer")}
+        assert "alvin" in officers
+        assert officers["gina@yopmail.com"]["custom:company"] == "Certis"
+
+
+class TestProvisionUsers:
+    def test_resumes_from_checkpoint(self, cognito, tmp_path):
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(
+            "email,user_group,company\n"
+            "gina@yopmail.com,officer,Certis\n"
+            "hari@yopmail.com,supervisor,\n"
+        )
+        checkpoint = tmp_path / "users.done"
+        checkpoint.write_text("gina@yopmail.com\n")
+
+        summary = provision_users.provision_users(
+            cognito.pool_id, str(csv_file), checkpoint_file=str(checkpoint)
+        )
+
+        assert summary["skipped"] == 1
+        assert summary["created"] == 1
+        assert checkpoint.read_text().split() == ["gina@yopmail.com", "hari@yopmail.com"]
+        assert [u["Username"] for u in cognito.get_users_in_group("supervisor")].count("hari@yopmail.com") == 1
+        assert "gina@yopmail.com" not in [u["Username"] for u in cognito.get_users()]
+
+    def test_rejects_csv_without_header(self, tmp_path):
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text("gina@yopmail.com,officer\n")
+
+        with pytest.raises(ValueError):
+            provision_users.read_users_csv(str(csv_file))
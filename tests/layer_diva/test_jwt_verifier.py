@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+import time
+
+import pytest
+from Crypto.PublicKey import RSA
+from jose import jwk, jwt
+
+ISSUER = "https://cognito-idp.ap-southeast-1.amazonaws.com/ap-southeast-1_test"
+CLIENT_ID = "test-client"
+
+
+@pytest.fixture(scope="module")
+def signing_keys():
+    return {kid: RSA.generate(2048) for kid in ["key-1", "key-2"]}
+
+
+@pytest.fixture
+def jwks_file(tmp_path, signing_keys):
+    def _write(*kids):
+        keys = [
+            {
+                **jwk.construct(
+                    signing_keys[kid].publickey().export_key().decode(), "RS256"
+                ).to_dict(),
+                "kid": kid,
+            }
+            for kid in kids
+        ]
+        path = tmp_path / "jwks.json"
+        path.write_text(json.dumps({"keys": keys}))
+        return str(path)
+
+    return _write
+
+
+@pytest.fixture
+def jwt_verifier(monkeypatch):
+    jwt_verifier = importlib.import_module("jwt_verifier")
+    monkeypatch.setattr(jwt_verifier, "ISSUER", ISSUER)
+    monkeypatch.setattr(jwt_verifier, "CLIENT_IDS", [CLIENT_ID])
+    return jwt_verifier
+
+
+def make_token(signing_keys, kid="key-1", **overrides):
+    claims = {
+        "sub": "1234",
+        "iss": ISSUER,
+        "client_id": CLIENT_ID,
+        "token_use": "access",
+        "username": "rrt_alvin_super@yopmail.com",
+        "cognito:groups": ["supervisor"],
+        "exp": int(time.time()) + 3600,
+        **overrides,
+    }
+    return jwt.encode(
+        claims,
+        signing_keys[kid].export_key().decode(),
+        algorithm="RS256",
+        headers={"kid": kid},
+    )
+
+
+class TestVerifyAccessToken:
+    def test_valid(self, jwt_verifier, jwks_file, signing_keys):
+        jwks = jwt_verifier.JwksCache(jwks_file("key-1"))
+
+        claims = jwt_verifier.verify_access_token(make_token(signing_keys), jwks)
+
+        assert jwt_verifier.get_cred_data(claims) == {
+            "username": "rrt_alvin_super@yopmail.com",
+            "sub": "1234",
+            "role": "supervisor",
+        }
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"exp": int(time.time()) - 10},
+            {"iss": "https://example.com"},
+            {"client_id": "other-client"},
+            {"token_use": "id"},
+        ],
+    )
+    def test_invalid_claims(self, jwt_verifier, jwks_file, signing_keys, overrides):
+        jwks = jwt_verifier.JwksCache(jwks_file("key-1"))
+
+        with pytest.raises(jwt_verifier.InvalidToken):
+            jwt_verifier.verify_access_token(make_token(signing_keys, **overrides), jwks)
+
+    def test_bad_signature(self, jwt_verifier, jwks_file, signing_keys):
+        jwks = jwt_verifier.JwksCache(jwks_file("key-1"))
+        # Signed with key-2 but claiming to be signed with key-1
+        _, payload, signature = make_token(signing_keys, kid="key-2").split(".")
+        forged = ".".join([make_token(signing_keys).split(".")[0], payload, signature])
+
+        with pytest.raises(jwt_verifier.InvalidToken):
+            jwt_verifier.verify_access_token(forged, jwks)
+
+    def test_unknown_kid_refreshes_jwks(self, jwt_verifier, jwks_file, signing_keys):
+        jwks = jwt_verifier.JwksCache(jwks_file("key-1"), min_refresh_interval=0)
+        jwt_verifier.verify_access_token(make_token(signing_keys), jwks)
+
+        jwks_file("key-1", "key-2")
+        claims = jwt_verifier.verify_access_token(make_token(signing_keys, kid="key-2"), jwks)
+
+        assert claims["sub"] == "1234"
+
+    def test_refresh_is_rate_limited(self, jwt_verifier, jwks_file, signing_keys):
+        jwks = jwt_verifier.JwksCache(jwks_file("key-1"), min_refresh_interval=60)
+        jwt_verifier.verify_access_token(make_token(signing_keys), jwks)
+
+        jwks_file("key-1", "key-2")
+        with pytest.raises(jwt_verifier.InvalidToken):
+            jwt_verifier.verify_access_token(make_token(signing_keys, kid="key-2"), jwks)
+
+    def test_validate_token_info_local_mode(
+        self, jwt_verifier, jwks_file, signing_keys, monkeypatch
+    ):
+        request_validation = importlib.import_module("request_validation")
+        monkeypatch.setattr(request_validation, "TOKEN_VERIFICATION_MODE", "local")
+        monkeypatch.setattr(jwt_verifier, "JWKS", jwt_verifier.JwksCache(jwks_file("key-1")))
+        token = make_token(signing_keys)
+
+        assert request_validation._validate_token_info(["supervisor"], token)[0]
+        assert request_validation._validate_token_info(["admin"], token) == (False, {})
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import importlib
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def logger():
+    return importlib.import_module("logger")
+
+
+class CountingRepr:
+    calls = 0
+
+    def __repr__(self):
+        CountingRepr.calls += 1
+        return "x" * 5000
+
+
+class TestLogger:
+    def test_truncate_to_byte_budget(self, logger):
+        assert logger.truncate("short", 10) == "short"
+        truncated = logger.truncate("é" * 100, 11)
+        assert truncated.startswith("é" * 5)
+        assert truncated.endswith("[189 bytes truncated]")
+
+    def test_lazy_repr_only_formats_when_emitted(self, logger, caplog):
+        CountingRepr.calls = 0
+        quiet = logging.getLogger("test_logger.quiet")
+        quiet.setLevel(logging.WARNING)
+        quiet.info("Payload: %s", logger.LazyRepr(CountingRepr()))
+        assert CountingRepr.calls == 0
+
+        with caplog.at_level(logging.INFO, logger="test_logger.quiet"):
+            quiet.info("Payload: %s", logger.LazyRepr(CountingRepr(), max_bytes=100))
+        assert CountingRepr.calls > 0
+        assert len(caplog.records[0].getMessage()) < 200
+
+    def test_sampled_by_correlation_id(self, logger, monkeypatch):
+        monkeypatch.setattr(logger, "LOG_PAYLOAD_SAMPLE_RATE", 0.5)
+        decisions = {cid: logger.is_payload_sampled(cid) for cid in map(str, range(200))}
+
+        assert all(logger.is_payload_sampled(cid) == d for cid, d in decisions.items())
+        assert 50 < sum(decisions.values()) < 150
+
+        monkeypatch.setattr(logger, "LOG_PAYLOAD_SAMPLE_RATE", 0)
+        monkeypatch.setattr(logger, "LOG_PAYLOAD_CORRELATION_IDS", frozenset(["debug-me"]))
+        assert logger.is_payload_sampled("debug-me")
+        assert not logger.is_payload_sampled("other")
+
+    def test_log_io_enabled_per_function(self, logger, monkeypatch, mocker):
+        monkeypatch.setattr(logger, "LOG_IO_FUNCTIONS", frozenset(["traced"]))
+        monkeypatch.setattr(logger, "LOG_PAYLOAD_SAMPLE_RATE", 1)
+        info = mocker.spy(logger.log, "info")
+
+        @logger.log_io
+        def traced(value):
+            return value * 2
+
+        @logger.log_io
+        def untraced(value):
+            return value * 2
+
+        assert untraced(2) == 4
+        assert info.call_count == 0
+        assert traced(2) == 4
+        assert info.call_count == 2
+        assert traced.__name__ == "traced"
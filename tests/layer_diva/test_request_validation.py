@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import base64
+import importlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+
+from tests.utils import dict_to_lambda_event
+
+
+@pytest.fixture(scope="class")
+def get_request_validation():
+    return importlib.import_module("request_validation")
+
+
+@dataclass
+class SampleInput:
+    name: str
+    start_of_week: Optional[str] = field(metadata={"regex": r"^(\d{4}-\d{2}-\d{2})$"})
+    count: Optional[int] = field(metadata={"regex": r"^\d{1,3}$", "converter": int})
+
+
+class TestParseEvent:
+    def test_plan_is_memoised(self, get_request_validation):
+        plan = get_request_validation._get_validator_plan(SampleInput)
+
+        assert get_request_validation._get_validator_plan(SampleInput) is plan
+        assert plan.required_fields == {"name"}
+        assert plan.all_fields == {"name", "start_of_week", "count"}
+
+    def test_valid(self, get_request_validation):
+        parsed = get_request_validation.parse_event(
+            dict_to_lambda_event(
+                {"name": "a", "start_of_week": "2022-01-03", "count": "12"}
+            ),
+            SampleInput,
+        )
+
+        assert parsed == SampleInput("a", "2022-01-03", 12)
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"start_of_week": "2022-01-03"},
+            {"name": "a", "unexpected": "b"},
+            {"name": "a", "start_of_week": "2022-01-03\n"},
+            {"name": "a", "count": "1234"},
+        ],
+    )
+    def test_invalid(self, get_request_validation, body):
+        bad_request = importlib.import_module("api_response_handler").BadRequest
+
+        with pytest.raises(bad_request):
+            get_request_validation.parse_event(dict_to_lambda_event(body), SampleInput)
+
+
+    def test_registry_pattern_only_on_request(self, get_request_validation):
+        @dataclass
+        class RegistryInput:
+            company: str = field(metadata={"registry": "company"})
+            location: Optional[str]
+
+        plan = get_request_validation._get_validator_plan(RegistryInput)
+
+        assert plan.field_plans[0].pattern is importlib.import_module(
+            "regex_registry"
+        ).REGISTRY.get("company")
+        assert plan.field_plans[1].pattern is None
+
+    def test_unregistered_pattern(self, get_request_validation):
+        @dataclass
+        class UnregisteredInput:
+            name: str = field(metadata={"registry": "not_registered"})
+
+        with pytest.raises(ValueError):
+            get_request_validation._get_validator_plan(UnregisteredInput)
+
+
+class TestValidateKeys:
+    def test_valid(self, get_request_validation):
+        body = {"company": "CAG", "start_of_week": "2022-01-03", "contact_num": "91234567"}
+
+        assert get_request_validation.validate_keys(
+            body, ["company"], ["start_of_week", "contact_num"]
+        )
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"company": "CAG", "start_of_week": "03-01-2022"},
+            {"company": "CAG", "contact_num": "1234"},
+            {"company": "CAG", "unknown": "x"},
+            {"start_of_week": "2022-01-03"},
+        ],
+    )
+    def test_invalid(self, get_request_validation, body):
+        assert not get_request_validation.validate_keys(
+            body, ["company"], ["start_of_week", "contact_num"]
+        )
+
+    def test_registered_bag_patterns(self, get_request_validation):
+        importlib.import_module("models.bag")
+        regex_registry = importlib.import_module("regex_registry")
+
+        assert regex_registry.validate({"bag_id": "Bag1", "color": "red", "weight": "23.5"})
+        assert not regex_registry.validate({"bag_id": "Bag1", "weight": "heavy"})
+
+    def test_registry_is_immutable(self):
+        regex_registry = importlib.import_module("regex_registry")
+
+        with pytest.raises(TypeError):
+            regex_registry.REGISTRY.patterns["company"] = None
+
+
+def make_access_token(exp):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'RS256'})}.{encode({'exp': exp})}.signature"
+
+
+class TestTokenCache:
+    @pytest.fixture
+    def cognito(self, get_request_validation, mocker):
+        get_request_validation.TOKEN_CACHE.clear()
+        importlib.import_module("util_helper").SSM_PARAMETER_CACHE.clear()
+        aws_clients = importlib.import_module("aws_clients")
+        cognito = aws_clients.client("cognito-idp")
+        mocker.patch.object(
+            cognito,
+            "get_user",
+            return_value={
+                "Username": "rrt_alvin_super@yopmail.com",
+                "UserAttributes": [{"Name": "custom:company", "Value": "Certis"}],
+            },
+        )
+        mocker.patch.object(
+            cognito,
+            "admin_list_groups_for_user",
+            return_value={"Groups": [{"GroupName": "supervisor"}]},
+        )
+        mocker.patch.object(
+            aws_clients.client("ssm"),
+            "get_parameter",
+            return_value={"Parameter": {"Value": "pool-id"}},
+        )
+        return cognito
+
+    def test_repeat_calls_are_cached(self, get_request_validation, cognito):
+        token = make_access_token(time.time() + 3600)
+
+        for _ in range(3):
+            valid, cred_data = get_request_validation._validate_token_info(
+                ["supervisor"], token
+            )
+            assert valid
+            assert cred_data == {"custom:company": "Certis", "role": "supervisor"}
+
+        assert cognito.get_user.call_count == 1
+        assert cognito.admin_list_groups_for_user.call_count == 1
+
+    def test_cached_role_is_still_checked(self, get_request_validation, cognito):
+        token = make_access_token(time.time() + 3600)
+
+        assert get_request_validation._validate_token_info(["supervisor"], token)[0]
+        assert get_request_validation._validate_token_info(["admin"], token) == (False, {})
+
+    def test_expired_token_is_not_cached(self, get_request_validation, cognito):
+        token = make_access_token(time.time() - 1)
+
+        get_request_validation._validate_token_info(["supervisor"], token)
+        get_request_validation._validate_token_info(["supervisor"], token)
+
+        assert cognito.get_user.call_count == 2
+
+    def test_ssm_parameter_is_cached(self, get_request_validation, cognito):
+        ssm = importlib.import_module("aws_clients").client("ssm")
+
+        get_request_validation._validate_token_info(
+            ["supervisor"], make_access_token(time.time() + 3600)
+        )
+        get_request_validation._validate_token_info(
+            ["supervisor"], make_access_token(time.time() + 7200)
+        )
+
+        assert cognito.get_user.call_count == 2
+        assert ssm.get_parameter.call_count == 1
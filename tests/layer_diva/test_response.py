@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+
+import pytest
+
+
+@pytest.fixture
+def response():
+    return importlib.import_module("response")
+
+
+class TestJsonArrayEncoder:
+    def test_encodes_as_json_dumps(self, response):
+        values = [{"name": 'quote " and \\ slash', "n": 1}, [1.5, None, True], "café"]
+        encoder = response.JsonArrayEncoder(max_bytes=1024)
+
+        assert encoder.getvalue() == json.dumps([])
+        for value in values:
+            assert encoder.add(value)
+
+        assert encoder.getvalue() == json.dumps(values)
+        assert encoder.count == 3
+        # The size of the body as a string inside the Lambda response
+        assert encoder.size == len(json.dumps(encoder.getvalue())) - 2
+
+    def test_stops_at_budget(self, response):
+        value = {"capsule_id": "123456"}
+        one = len(json.dumps(json.dumps([value]))) - 2
+        encoder = response.JsonArrayEncoder(max_bytes=2 * one - 1)
+
+        assert encoder.add(value)
+        assert not encoder.add(value)
+        assert encoder.getvalue() == json.dumps([value])
+        assert encoder.count == 1
+        assert encoder.size == one
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+
+import pytest
+
+
+@pytest.fixture
+def stage_metrics():
+    return importlib.import_module("stage_metrics")
+
+
+class TestStageMetrics:
+    def test_noop_outside_handler(self, stage_metrics):
+        with stage_metrics.stage("query") as timer:
+            stage_metrics.count("query", 3)
+            stage_metrics.set_query_path("scan")
+
+        assert timer is None
+        assert stage_metrics.current() is None
+
+    def test_timed_handler_emits_emf(self, stage_metrics, capsys):
+        @stage_metrics.timed_handler("test-handler")
+        def handler(event, context):
+            stage_metrics.set_query_path("gsi")
+            with stage_metrics.stage("query"):
+                stage_metrics.count("query", 2)
+            with stage_metrics.stage("query"):
+                stage_metrics.count("query", 3)
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            handler({}, None)
+
+        record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        directive = record["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Dimensions"] == [["handler", "query_path", "service"]]
+        assert record["handler"] == "test-handler"
+        assert record["query_path"] == "gsi"
+        assert record["query_items"] == [5]
+        assert record["total_ms"][0] >= record["query_ms"][0] >= 0
+        assert stage_metrics.current() is None
+
+    def test_stage_timer_accumulates(self, stage_metrics):
+        ticks = iter([0, 1, 1.5, 2, 2.25])
+        timer = stage_metrics.StageTimer("test-handler", clock=lambda: next(ticks))
+
+        with timer.stage("decrypt"):
+            pass
+        with timer.stage("decrypt"):
+            pass
+
+        assert timer.durations == {"decrypt": 750}
+
+    def test_worker_stages_reach_invocation(self, stage_metrics, monkeypatch):
+        util_helper = importlib.import_module("util_helper")
+
+        def producer():
+            with stage_metrics.stage("segment"):
+                stage_metrics.count("segment", 1)
+            yield 1
+
+        def decrypt_data(row, fields_to_decrypt):
+            stage_metrics.count("row", 1)
+
+        monkeypatch.setattr(util_helper, "decrypt_data", decrypt_data)
+        with stage_metrics.record("test-handler") as timer:
+            assert list(util_helper.iter_concurrently([producer, producer])) == [1, 1]
+            assert util_helper.decrypt_data_bulk([{}, {}, {}], ["field"]) == {}
+
+        assert timer.counts == {"segment": 2, "row": 3}
+        assert "segment" in timer.durations
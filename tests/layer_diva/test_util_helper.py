@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import base64
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture(scope="class")
+def get_util_helper():
+    return importlib.import_module("util_helper")
+
+
+def kms_encrypt(kms_setup, value):
+    encrypted = kms_setup.encrypt(
+        KeyId=pytest.kms_key_id, Plaintext=bytes(value, "utf-8")
+    )
+    return base64.b64encode(encrypted["CiphertextBlob"]).decode("utf-8")
+
+
+class TestDecryptDataBulk:
+    def test_preserves_order(self, get_util_helper, kms_setup):
+        rows = [
+            {"capsule_id": str(i), "nric_sha": kms_encrypt(kms_setup, f"nric-{i}")}
+            for i in range(20)
+        ]
+
+        failures = get_util_helper.decrypt_data_bulk(rows, ["nric_sha"], max_workers=4)
+
+        assert failures == {}
+        assert [row["nric_sha"] for row in rows] == [f"nric-{i}" for i in range(20)]
+        assert [row["capsule_id"] for row in rows] == [str(i) for i in range(20)]
+
+    def test_reports_failed_rows(self, get_util_helper, kms_setup):
+        rows = [
+            {"nric_sha": kms_encrypt(kms_setup, "first")},
+            {"nric_sha": base64.b64encode(b"not a ciphertext").decode("utf-8")},
+            {"nric_sha": kms_encrypt(kms_setup, "third")},
+        ]
+
+        failures = get_util_helper.decrypt_data_bulk(rows, ["nric_sha"])
+
+        assert list(failures) == [1]
+        assert rows[0]["nric_sha"] == "first"
+        assert rows[2]["nric_sha"] == "third"
+
+    def test_empty(self, get_util_helper):
+        assert get_util_helper.decrypt_data_bulk([], ["nric_sha"]) == {}
+
+
+class TestEnvelopeEncryption:
+    @pytest.fixture(autouse=True)
+    def data_key_cache(self, get_util_helper, monkeypatch):
+        cache = get_util_helper.DataKeyCache(max_age=300, max_messages=3)
+        monkeypatch.setattr(get_util_helper, "DATA_KEY_CACHE", cache)
+        return cache
+
+    def test_round_trip(self, get_util_helper):
+        row = {"capsule_id": "888888", "nric_sha": "secret"}
+
+        get_util_helper.encrypt_data(
+            pytest.kms_key_id, row, ["nric_sha"], mode="envelope"
+        )
+        assert row["nric_sha"].startswith("env1:")
+        assert row["capsule_id"] == "888888"
+
+        get_util_helper.decrypt_data(row, ["nric_sha"])
+        assert row["nric_sha"] == "secret"
+
+    def test_data_key_reused_until_rotation(self, get_util_helper, mocker):
+        spy = mocker.spy(get_util_helper.KMS, "generate_data_key")
+        rows = [{"nric_sha": f"nric-{i}"} for i in range(7)]
+
+        for row in rows:
+            get_util_helper.encrypt_data(
+                pytest.kms_key_id, row, ["nric_sha"], mode="envelope"
+            )
+
+        assert spy.call_count == 3
+        assert len({row["nric_sha"] for row in rows}) == 7
+
+    def test_legacy_ciphertext_still_decrypts(self, get_util_helper, kms_setup):
+        rows = [
+            {"nric_sha": kms_encrypt(kms_setup, "legacy")},
+            {"nric_sha": "modern"},
+        ]
+        get_util_helper.encrypt_data(
+            pytest.kms_key_id, rows[1], ["nric_sha"], mode="envelope"
+        )
+
+        assert get_util_helper.decrypt_data_bulk(rows, ["nric_sha"]) == {}
+        assert [row["nric_sha"] for row in rows] == ["legacy", "modern"]
+
+
+class TestLRUCache:
+    @pytest.fixture
+    def clock(self):
+        class Clock:
+            now = 0.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    def test_ttl_expiry(self, get_util_helper, clock):
+        cache = get_util_helper.LRUCache(max_items=10, ttl=5, clock=clock)
+        cache.put("a", "1")
+
+        assert cache.get("a") == "1"
+        clock.now = 5
+        assert cache.get("a") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["items"] == 0
+
+    def test_lru_eviction(self, get_util_helper, clock):
+        cache = get_util_helper.LRUCache(max_items=2, ttl=5, clock=clock)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+
+    def test_max_bytes(self, get_util_helper, clock):
+        cache = get_util_helper.LRUCache(max_items=100, ttl=5, max_bytes=300, clock=clock)
+        for i in range(10):
+            cache.put(str(i), "x" * 50)
+
+        assert cache.stats()["bytes"] <= 300
+        assert cache.get("9") == "x" * 50
+        assert cache.get("0") is None
+
+    def test_decrypt_data_is_cached(self, get_util_helper, kms_setup, mocker):
+        get_util_helper.DECRYPT_CACHE.clear()
+        ciphertext = kms_encrypt(kms_setup, "hot")
+        spy = mocker.spy(get_util_helper.KMS, "decrypt")
+
+        for _ in range(3):
+            row = {"nric_sha": ciphertext}
+            get_util_helper.decrypt_data(row, ["nric_sha"])
+            assert row["nric_sha"] == "hot"
+
+        assert spy.call_count == 1
+        assert get_util_helper.DECRYPT_CACHE.stats()["hits"] == 2
+
+
+class TestTokenBucket:
+    def test_waits_for_refill(self, get_util_helper):
+        class Clock:
+            now = 0.0
+
+            def __call__(self):
+                return self.now
+
+            def sleep(self, seconds):
+                self.now += seconds
+
+        clock = Clock()
+        bucket = get_util_helper.TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(15)]
+
+        assert waits[:10] == [0] * 10
+        assert all(wait == pytest.approx(0.1) for wait in waits[10:])
+        assert clock.now == pytest.approx(0.5)
+
+
+class TestReadThroughCache:
+    def test_concurrent_misses_load_once(self, get_util_helper):
+        cache = get_util_helper.ReadThroughCache(get_util_helper.LRUCache(10, 60))
+        release = threading.Event()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            release.wait(5)
+            return ["booking"]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(cache.get, "key", loader) for _ in range(8)]
+            time.sleep(0.1)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert loads == [1]
+        assert all(result is results[0] for result in results)
+        assert cache.get("key", loader) is results[0]
+        stats = cache.stats()
+        assert stats["coalesced"] == 7
+        assert stats["loads"] == 1
+        assert stats["hits"] == 1
+        assert stats["hit_ms_max"] >= stats["hit_ms_avg"] >= 0
+
+    def test_failed_load_is_not_cached(self, get_util_helper):
+        cache = get_util_helper.ReadThroughCache(get_util_helper.LRUCache(10, 60))
+
+        def failing():
+            raise ValueError("ddb down")
+
+        with pytest.raises(ValueError):
+            cache.get("key", failing)
+        assert cache.get("key", lambda: "ok") == "ok"
+
+    def test_invalidated_during_load_is_not_cached(self, get_util_helper):
+        cache = get_util_helper.ReadThroughCache(get_util_helper.LRUCache(10, 60))
+
+        def loader():
+            cache.invalidate_where(lambda key: True)
+            return "stale"
+
+        assert cache.get("key", loader) == "stale"
+        assert cache.get("key", lambda: "fresh") == "fresh"
+        assert cache.get("key", lambda: "other") == "fresh"
+
+    def test_custom_sizeof_caps_memory(self, get_util_helper):
+        cache = get_util_helper.LRUCache(10, 60, max_bytes=500, sizeof=lambda value: len(value) * 200)
+        cache.put("a", "xx")
+        cache.put("b", "xx")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "xx"
+
+
+class FakeSegmentedModel:
+    """Stands in for a pynamodb model, moto ignores Segment/TotalSegments"""
+
+    rows = list(range(100))
+    fail_segment = None
+
+    @classmethod
+    def scan(cls, segment, total_segments, **kwargs):
+        if segment == cls.fail_segment:
+            raise RuntimeError("segment failed")
+        return iter(cls.rows[segment::total_segments])
+
+
+class TestParallelScan:
+    def test_merges_all_segments(self, get_util_helper):
+        items = list(get_util_helper.parallel_scan(FakeSegmentedModel, 4))
+
+        assert sorted(items) == FakeSegmentedModel.rows
+
+    def test_honours_limit(self, get_util_helper):
+        items = list(get_util_helper.parallel_scan(FakeSegmentedModel, 4, limit=10))
+
+        assert len(items) == 10
+        assert len(set(items)) == 10
+
+    def test_raises_segment_error(self, get_util_helper, monkeypatch):
+        monkeypatch.setattr(FakeSegmentedModel, "fail_segment", 2)
+
+        with pytest.raises(RuntimeError):
+            list(get_util_helper.parallel_scan(FakeSegmentedModel, 4))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+One-off backfill of Booking.company_location into the company_location-start_of_week-index.
+"""
+import importlib
+
+import pytest
+
+from scripts import backfill_booking_index
+
+
+@pytest.fixture
+def booking():
+    return importlib.import_module("models.booking").Booking
+
+
+def put_legacy_booking(ddb_client, capsule_id, location="Airport"):
+    ddb_client.put_item(
+        TableName="diva-blp-booking",
+        Item={
+            "capsule_id": {"S": capsule_id},
+            "activity_date": {"S": "2022-01-05"},
+            "start_of_week": {"S": "2022-01-03"},
+            "company": {"S": "CAG"},
+            "location": {"S": location},
+            "nric_sha": {"S": ""},
+        },
+    )
+
+
+class TestBackfillBookingIndex:
+    def test_save_maintains_company_location(self, booking):
+        booking(
+            capsule_id="100001",
+            activity_date="2022-01-05",
+            start_of_week="2022-01-03",
+            company="CAG",
+            location="Jewel",
+            nric_sha="",
+        ).save()
+
+        assert booking.get("100001", "2022-01-05").company_location == "CAG#Jewel"
+
+    def test_update_maintains_company_location(self, booking):
+        saved = booking(
+            capsule_id="100001",
+            activity_date="2022-01-05",
+            start_of_week="2022-01-03",
+            company="CAG",
+            location="Jewel",
+            nric_sha="",
+        )
+        saved.save()
+
+        saved.update(actions=[booking.location.set("Tuas")])
+        assert booking.get("100001", "2022-01-05").company_location == "CAG#Tuas"
+
+        saved.update(actions=[booking.company.set("A#B"), booking.nric_sha.set("x")])
+        assert booking.get("100001", "2022-01-05").company_location == "A\\#B#Tuas"
+
+        with pytest.raises(ValueError):
+            saved.update(actions=[booking.location.remove()])
+
+    def test_separator_is_escaped(self):
+        company_location_key = importlib.import_module("models.booking").company_location_key
+
+        assert company_location_key("A#B", "C") != company_location_key("A", "B#C")
+        assert company_location_key("A\\", "#C") != company_location_key("A\\#", "C")
+
+    def test_backfill(self, booking, ddb_client):
+        for capsule_id in ["100001", "100002", "100003"]:
+            put_legacy_booking(ddb_client, capsule_id, location="Tuas")
+        assert list(booking.company_location_startofweek_index.query("CAG#Tuas")) == []
+
+        summary = backfill_booking_index.backfill(segments=1, max_workers=2)
+
+        assert summary["updated"] == 3
+        assert summary["failed"] == 0
+        indexed = booking.company_location_startofweek_index.query("CAG#Tuas")
+        assert sorted(b.capsule_id for b in indexed) == ["100001", "100002", "100003"]
+        assert backfill_booking_index.backfill(segments=1)["scanned"] == 0
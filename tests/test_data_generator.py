@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic data generator: deterministic, skewed, encrypted where the model says so, and bulk loaded.
+"""
+import importlib
+from collections import Counter
+
+import pytest
+
+from tests import data_generator
+
+
+def test_bookings_are_deterministic_and_unique():
+    bookings = list(data_generator.generate_bookings(2000, seed=7))
+
+    assert bookings == list(data_generator.generate_bookings(2000, seed=7))
+    assert len(bookings) == 2000
+    assert len({(b["capsule_id"], b["activity_date"]) for b in bookings}) == 2000
+
+
+def test_bookings_are_skewed():
+    bookings = list(data_generator.generate_bookings(5000))
+    companies = Counter(b["company"] for b in bookings)
+    weeks = Counter(b["start_of_week"] for b in bookings)
+
+    assert companies.most_common(1)[0][0] == data_generator.COMPANIES[0]
+    assert companies[data_generator.COMPANIES[0]] > 3 * companies[data_generator.COMPANIES[-1]]
+    assert weeks["2022-01-03"] > 2 * weeks["2022-01-10"]
+
+
+def test_delay_lists_have_a_long_tail():
+    lengths = [len(d["delays"]) for d in data_generator.generate_baggage_delays(2000)]
+
+    assert min(lengths) >= 1
+    assert sorted(lengths)[len(lengths) // 2] <= 2
+    assert max(lengths) >= 50
+
+
+@pytest.mark.parametrize("fast_cipher", [True, False])
+def test_encrypted_fields_are_envelope_encrypted(kms_setup, monkeypatch, fast_cipher):
+    if fast_cipher and data_generator.AESGCM is None:
+        pytest.skip("cryptography is not installed")
+    if not fast_cipher:
+        monkeypatch.setattr(data_generator, "AESGCM", None)
+    util_helper = importlib.import_module("util_helper")
+    plain = next(data_generator.generate_bookings(1))
+
+    item = next(data_generator.generate_items("booking", 1, kms_key_id=pytest.kms_key_id))
+
+    assert item["company"] == {"S": plain["company"]}
+    assert item["nric_sha"]["S"].startswith("env1:")
+    row = {"nric_sha": item["nric_sha"]["S"]}
+    util_helper.decrypt_data(row, ["nric_sha"])
+    assert row["nric_sha"] == plain["nric_sha"]
+
+    with pytest.raises(ValueError):
+        next(data_generator.generate_items("booking", 1))
+
+
+@pytest.mark.parametrize("kind", sorted(data_generator.DATASETS))
+def test_load(kind, ddb_client, kms_setup):
+    table_name = data_generator.get_model(kind).Meta.table_name
+    seeded = ddb_client.scan(TableName=table_name, Select="COUNT")["Count"]
+
+    loaded = data_generator.load(kind, 120, kms_key_id=pytest.kms_key_id)
+
+    assert loaded == 120
+    assert ddb_client.scan(TableName=table_name, Select="COUNT")["Count"] == seeded + 120
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Cold start regression check: importing a handler entry point has to stay within its budget in import_budgets.json.
+
+max_ratio is a margin above each handler's measured import time over the reference imports
+of cold_start_profiler, about 1.7 for every handler. Before the heavy imports were deferred
+it was about 3.3.
+"""
+import pytest
+
+from tests.cold_start_profiler import list_handlers, profile_handler
+from tests.utils import load_file
+
+BUDGETS = load_file("import_budgets.json")
+
+
+def test_every_handler_has_a_budget():
+    assert sorted(BUDGETS) == list_handlers()
+
+
+@pytest.mark.parametrize("handler", sorted(BUDGETS))
+def test_import_budget(handler):
+    budget = BUDGETS[handler]
+
+    profile = profile_handler(handler, repeat=3)
+
+    assert not set(budget["forbidden_packages"]) & set(profile["packages_ms"]), profile
+    assert profile["ratio"] <= budget["max_ratio"], profile